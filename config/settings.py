@@ -11,6 +11,146 @@ class Config:
     
     DB_PATH = "linkedin_memory.db"
     
+    # Number of SQLite files user data is spread over; 1 keeps everything in DB_PATH
+    DB_SHARD_COUNT = int(os.getenv("DB_SHARD_COUNT", "1"))
+    DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+    
+    # Opt-in SQL tracing and slow-query log
+    DB_PROFILING = os.getenv("DB_PROFILING", "0") == "1"
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "50"))
+    SLOW_QUERY_LOG_PATH = os.getenv("SLOW_QUERY_LOG_PATH", "slow_queries.log")
+    
+    # Read-through query cache in DatabaseManager
+    QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+    QUERY_CACHE_TTL_SECONDS = int(os.getenv("QUERY_CACHE_TTL_SECONDS", "300"))
+    
+    # Model tiers available to the agents, cheapest first
+    MODEL_TIERS = {
+        "fast": {"model": "llama-3.1-8b-instant", "max_completion_tokens": 512, "temperature": 0.7},
+        "standard": {"model": "llama-3.1-8b-instant", "max_completion_tokens": 1024, "temperature": 0.9},
+        "large": {"model": "llama-3.3-70b-versatile", "max_completion_tokens": 2048, "temperature": 0.7}
+    }
+    
+    # Tier chosen per agent for simple, normal and complex requests
+    AGENT_MODEL_POLICY = {
+        "profile_analyzer": {"simple": "fast", "normal": "standard", "complex": "large"},
+        "job_fit_analyzer": {"simple": "standard", "normal": "standard", "complex": "large"},
+        "content_enhancer": {"simple": "fast", "normal": "standard", "complex": "standard"}
+    }
+    
+    # Request complexity thresholds used by the model policy
+    MODEL_SIMPLE_MAX_PROMPT_CHARS = 160
+    MODEL_COMPLEX_MIN_PROMPT_CHARS = 1200
+    # Prior user turns after which a request that is not short counts as complex
+    MODEL_COMPLEX_MIN_PRIOR_TURNS = 4
+    MODEL_SIMPLE_KEYWORDS = ["headline", "title", "one line", "shorter", "shorten", "tagline", "rephrase"]
+    MODEL_COMPLEX_KEYWORDS = ["job description", "detailed", "in depth", "in-depth", "compare",
+                              "full analysis", "step by step", "requirements", "strategy"]
+    
+    # LLM record/replay: "off", "record" or "replay"
+    LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off")
+    LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", "llm_cassettes.db")
+    # Multiplier on recorded latency when replaying; 0 replays at full speed
+    LLM_REPLAY_LATENCY_SCALE = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1.0"))
+    # What replay does on an unrecorded request: error, passthrough, record or stub
+    LLM_REPLAY_UNKNOWN_POLICY = os.getenv("LLM_REPLAY_UNKNOWN_POLICY", "error")
+    
+    # Hard ceiling on a chat turn; past it a degraded local answer is returned
+    TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", "20"))
+    # Send a second, hedged request once the first is slower than this latency percentile.
+    # Off by default: the losing copy is billed too (and counted against the quota)
+    HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "0") == "1"
+    HEDGE_PERCENTILE = 95
+    HEDGE_MIN_SAMPLES = 20
+    HEDGE_MIN_DELAY_SECONDS = 1.0
+    HEDGE_POOL_SIZE = 16
+    HEDGE_MAX_IN_FLIGHT = 4  # hedges beyond this are skipped so they cannot fill the pool
+    
+    # Per-user daily token budget (prompt + completion); 0 disables the quota
+    DAILY_TOKEN_QUOTA = int(os.getenv("DAILY_TOKEN_QUOTA", "100000"))
+    
+    # Speculative pre-generation of the first profile review
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") == "1"
+    PREFETCH_QUESTION = "How can I improve my LinkedIn profile?"
+    # A message is served the prefetched review only if it uses nothing but these
+    # words, so "improve my profile for a product manager role" gets a fresh answer
+    PREFETCH_QUESTION_WORDS = ["how", "can", "could", "would", "should", "do", "what", "i", "my", "me",
+                               "you", "please", "the", "a", "an", "linkedin", "profile", "improve",
+                               "optimize", "optimise", "better", "make", "review", "feedback", "give",
+                               "get", "some", "any", "tips", "help", "overall", "general", "on", "to",
+                               "with", "it", "is", "there"]
+    PREFETCH_ACTION_WORDS = ["improve", "optimize", "optimise", "better", "review", "feedback"]
+    PREFETCH_MAX_QUESTION_CHARS = 120
+    # Rough prompt size used to check a prefetch fits the remaining quota
+    PREFETCH_CHARS_PER_TOKEN = 4
+    
+    # Skills taxonomy used to canonicalize profile skills to stable ids
+    SKILLS_TAXONOMY_PATH = os.getenv(
+        "SKILLS_TAXONOMY_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "skills_taxonomy.json")
+    )
+    SKILL_FUZZY_THRESHOLD = 0.7  # trigram Dice similarity for typo matches
+    
+    # Peer benchmarks from incrementally maintained cohort aggregates
+    COHORT_STATS_ENABLED = os.getenv("COHORT_STATS_ENABLED", "1") == "1"
+    COHORT_MIN_SIZE = 20  # smaller cohorts fall back to a broader one
+    COHORT_TOP_SKILLS = 8
+    
+    # Background database maintenance (see database/maintenance.py)
+    MAINTENANCE_ENABLED = os.getenv("MAINTENANCE_ENABLED", "1") == "1"
+    MAINTENANCE_INTERVALS = {  # seconds between runs of each task
+        "wal_checkpoint": 300,
+        "optimize": 3600,
+        "cleanup_sessions": 6 * 3600,
+        "incremental_vacuum": 6 * 3600,
+        "analyze": 24 * 3600,
+    }
+    MAINTENANCE_POLL_SECONDS = 5
+    MAINTENANCE_QUIET_SECONDS = 2  # run only after this long without foreground writes
+    MAINTENANCE_TASK_BUDGET_MS = 500  # a task is interrupted past this
+    MAINTENANCE_BUSY_TIMEOUT_MS = 100  # give up quickly instead of queueing behind writers
+    MAINTENANCE_VACUUM_PAGES = 1000
+    MAINTENANCE_CLEANUP_BATCH = 500
+    SESSION_RETENTION_DAYS = 30
+    
+    # Profile history and incremental re-analysis
+    PROFILE_VERSION_RETENTION = 20  # versions kept per user
+    INCREMENTAL_ANALYSIS_MAX_SECTIONS = 2  # larger edits get a full re-analysis
+    
+    # Cross-user cache of answers to generic, profile-independent questions
+    QUESTION_CACHE_ENABLED = os.getenv("QUESTION_CACHE_ENABLED", "1") == "1"
+    QUESTION_CACHE_THRESHOLD = 0.7  # estimated Jaccard similarity needed for a hit
+    QUESTION_CACHE_MAX_ENTRIES = 5000
+    QUESTION_CACHE_TTL_DAYS = 30
+    QUESTION_CACHE_NUM_PERM = 64
+    QUESTION_CACHE_BANDS = 16
+    QUESTION_CACHE_MAX_QUESTION_CHARS = 160
+    GENERIC_QUESTION_PREFIXES = ["how do i", "how can i", "how should i", "how to", "what should",
+                                 "what makes", "what is", "what are", "what's", "any tips", "tips for",
+                                 "best practices", "should i", "do recruiters", "how long", "how many"]
+    PERSONAL_QUESTION_MARKERS = ["my profile", "my linkedin", "my experience", "my background", "my skills",
+                                 "my current", "my resume", "my cv", "my job", "my role", "my career",
+                                 "my own", "for me", "fit me", "suit me", "am i", "i have", "i am", "i'm",
+                                 "i've", "i was", "review", "rewrite", "analyze", "analyse", "based on"]
+    # Any of these words ties a question to the user or to the conversation so far
+    PERSONAL_QUESTION_WORDS = ["my", "mine", "me", "myself", "our", "ours", "us"]
+    CONTEXT_DEPENDENT_WORDS = ["it", "its", "this", "that", "these", "those", "them", "they", "first",
+                               "above", "previous", "same", "else", "one", "ones", "here"]
+    # After earlier turns, messages opening like this (or this short) are treated as follow-ups
+    FOLLOW_UP_PREFIXES = ["and", "also", "what about", "how about", "then", "so", "but", "ok", "okay",
+                          "why", "what else", "anything else", "more"]
+    FOLLOW_UP_MAX_WORDS = 4
+    
+    # Background job runner for agent calls
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_RETENTION_SECONDS = 600
+    JOB_POLL_INTERVAL_SECONDS = 0.5
+    
+    # Local job-fit matching over a JSONL/CSV job-posting corpus
+    JOB_CORPUS_PATH = os.getenv("JOB_CORPUS_PATH")
+    JOB_MATCH_TOP_K = 5
+    JOB_MATCH_HASH_BITS = 20
+    
     AGENT_DESCRIPTIONS = {
         "profile_analyzer": "Specializes in LinkedIn profile optimization and completeness analysis",
         "job_fit_analyzer": "Expert in career planning and job-profile matching",
@@ -62,6 +202,6 @@ class Config:
     @classmethod
     def validate_env_vars(cls):
         """Validate required environment variables"""
-        if not cls.GROQ_API_KEY:
+        if not cls.GROQ_API_KEY and cls.LLM_CASSETTE_MODE != "replay":
             st.error("GROQ_API_KEY missing from .env file")
             st.stop()
\ No newline at end of file
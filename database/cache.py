@@ -0,0 +1,81 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class QueryCache:
+    """In-process LRU cache for per-user query results.
+
+    Entries are keyed by (user_id, user version, query shape). Writes bump the
+    user's version counter so stale entries can never be served again; they
+    are dropped eagerly and otherwise age out through LRU eviction.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _key(self, user_id: str, shape: Hashable) -> Tuple:
+        return (user_id, self._epoch, self._versions.get(user_id, 0), shape)
+
+    def get_or_load(self, user_id: str, shape: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached result for this query, loading it on a miss"""
+        with self._lock:
+            key = self._key(user_id, shape)
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            self.misses += 1
+
+        value = loader()
+
+        with self._lock:
+            # Only store if no write happened while we were loading
+            if key == self._key(user_id, shape):
+                self._entries[key] = (time.monotonic(), copy.deepcopy(value))
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Invalidate every cached query for a user"""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self.invalidations += 1
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+
+    def invalidate_all(self) -> None:
+        """Invalidate every cached query for all users"""
+        with self._lock:
+            self._epoch += 1
+            self.invalidations += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit-rate statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,269 @@
+"""Background SQLite maintenance.
+
+MaintenanceScheduler runs housekeeping on a daemon thread: passive WAL
+checkpoints, PRAGMA optimize, ANALYZE, incremental vacuum and session
+cleanup, each on its own interval from Config.MAINTENANCE_INTERVALS and for
+every database file. It stays out of the way of foreground traffic:
+
+- a task only starts on a file that has seen no writes for
+  MAINTENANCE_QUIET_SECONDS (detected through PRAGMA data_version), otherwise
+  it is retried on the next poll;
+- each task runs with a short busy timeout and is interrupted by a progress
+  handler once it exceeds MAINTENANCE_TASK_BUDGET_MS;
+- session cleanup commits in small batches and resumes where it stopped.
+
+Every run is recorded in the maintenance_runs table with its start time,
+duration, status and detail, and due times are computed from those records
+so a restart does not rerun everything.
+
+    python -m database.maintenance   # run every task once, now
+"""
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from config.settings import Config
+
+# Cheap tasks first so a long one cannot starve them within a poll
+TASKS = ("wal_checkpoint", "optimize", "cleanup_sessions", "incremental_vacuum", "analyze")
+# db_path recorded for tasks that span every shard
+ALL_SHARDS = "*"
+# Rows sampled per index by ANALYZE and PRAGMA optimize
+ANALYSIS_LIMIT = 1000
+# SQLite VM steps between budget checks
+PROGRESS_STEPS = 1000
+
+# Runs with these statuses are retried on the next quiet poll instead of waiting a full interval
+RETRY_STATUSES = ("busy", "partial")
+
+logger = logging.getLogger("linkedin_optimizer.maintenance")
+
+class MaintenanceScheduler:
+    """Runs SQLite housekeeping on a daemon thread while the databases are idle"""
+
+    def __init__(self, db_manager, intervals: Optional[Dict[str, float]] = None,
+                 poll_seconds: Optional[float] = None, quiet_seconds: Optional[float] = None,
+                 task_budget_ms: Optional[float] = None):
+        self.db_manager = db_manager
+        self.intervals = dict(Config.MAINTENANCE_INTERVALS if intervals is None else intervals)
+        self.poll_seconds = Config.MAINTENANCE_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self.quiet_seconds = Config.MAINTENANCE_QUIET_SECONDS if quiet_seconds is None else quiet_seconds
+        self.task_budget_ms = Config.MAINTENANCE_TASK_BUDGET_MS if task_budget_ms is None else task_budget_ms
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Serializes runs from the thread and from manual run_pending() calls
+        self._run_lock = threading.Lock()
+        self._probes: Dict[str, sqlite3.Connection] = {}
+        self._data_versions: Dict[str, int] = {}
+        self._last_write: Dict[str, float] = {}
+        self._last_run: Dict[Tuple[str, str], float] = {}
+        self._load_last_runs()
+
+    def _load_last_runs(self) -> None:
+        for run in self.db_manager.get_maintenance_runs():
+            if run["last_status"] in RETRY_STATUSES or not run["last_started_at"]:
+                continue
+            started = datetime.fromisoformat(run["last_started_at"]).timestamp()
+            self._last_run[(run["task"], run["db_path"])] = started
+
+    def start(self) -> "MaintenanceScheduler":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="db-maintenance", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._run_lock:
+            for probe in self._probes.values():
+                probe.close()
+            self._probes.clear()
+            self._data_versions.clear()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.run_pending()
+            except Exception:
+                # The thread must outlive any single failure
+                logger.exception("Maintenance poll failed")
+
+    def _targets(self, task: str) -> List[str]:
+        if task == "cleanup_sessions":
+            return [ALL_SHARDS]
+        return self.db_manager.router.all_paths
+
+    def _paths(self, target: str) -> List[str]:
+        return self.db_manager.router.shard_paths if target == ALL_SHARDS else [target]
+
+    def _data_version(self, path: str) -> int:
+        probe = self._probes.get(path)
+        if probe is None:
+            probe = self._probes[path] = sqlite3.connect(path, check_same_thread=False)
+        return probe.execute("PRAGMA data_version").fetchone()[0]
+
+    def _is_quiet(self, target: str) -> bool:
+        """True if no other connection has written to the target for quiet_seconds"""
+        now = time.monotonic()
+        quiet = True
+        for path in self._paths(target):
+            version = self._data_version(path)
+            if version != self._data_versions.get(path):
+                # First sighting counts as a write so a fresh process waits one quiet period
+                self._data_versions[path] = version
+                self._last_write[path] = now
+            if now - self._last_write[path] < self.quiet_seconds:
+                quiet = False
+        return quiet
+
+    def _absorb_own_writes(self, paths: List[str]) -> None:
+        """Accept data_version changes caused by maintenance itself"""
+        for path in paths:
+            if path in self._data_versions:
+                self._data_versions[path] = self._data_version(path)
+
+    def run_pending(self, force: bool = False) -> List[Dict]:
+        """Run every task that is due on a quiet database; force runs everything now"""
+        results = []
+        with self._run_lock:
+            for task in TASKS:
+                interval = self.intervals.get(task)
+                if not interval:
+                    continue  # disabled
+                for target in self._targets(task):
+                    if self._stop.is_set() and not force:
+                        return results
+                    if not force:
+                        if time.time() - self._last_run.get((task, target), 0) < interval:
+                            continue
+                        if not self._is_quiet(target):
+                            continue
+                    results.append(self.run_task(task, target))
+        return results
+
+    def run_task(self, task: str, target: str) -> Dict:
+        """Run one task within the time budget and record the outcome"""
+        started_at = datetime.now()
+        start = time.monotonic()
+        deadline = start + self.task_budget_ms / 1000
+        try:
+            status, detail = getattr(self, f"_{task}")(target, deadline)
+        except sqlite3.OperationalError as e:
+            message = str(e)
+            if time.monotonic() >= deadline or "interrupted" in message:
+                status, detail = "interrupted", f"stopped after {self.task_budget_ms:.0f}ms budget"
+            elif "locked" in message or "busy" in message:
+                status, detail = "busy", message
+            else:
+                status, detail = "error", message
+        except sqlite3.Error as e:
+            status, detail = "error", str(e)
+        duration_ms = (time.monotonic() - start) * 1000
+
+        if status not in RETRY_STATUSES:
+            self._last_run[(task, target)] = started_at.timestamp()
+        try:
+            self.db_manager.record_maintenance_run(
+                task, target, started_at.isoformat(), duration_ms, status, detail
+            )
+        except sqlite3.Error as e:
+            logger.warning("Could not record %s run on %s: %s", task, target, e)
+        self._absorb_own_writes(self._paths(target) + [self.db_manager.db_path])
+
+        logger.info("%s on %s: %s in %.1fms (%s)", task, target, status, duration_ms, detail)
+        return {
+            "task": task,
+            "db_path": target,
+            "started_at": started_at.isoformat(),
+            "duration_ms": duration_ms,
+            "status": status,
+            "detail": detail
+        }
+
+    @contextmanager
+    def _bounded(self, path: str, deadline: float) -> Iterator[sqlite3.Connection]:
+        """Connection that gives up on locks quickly and aborts past the deadline"""
+        conn = sqlite3.connect(path, check_same_thread=False)
+        try:
+            conn.execute(f"PRAGMA busy_timeout = {int(Config.MAINTENANCE_BUSY_TIMEOUT_MS)}")
+            conn.set_progress_handler(lambda: int(time.monotonic() >= deadline), PROGRESS_STEPS)
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _bounded_all(self, paths: List[str], deadline: float) -> Iterator[List[sqlite3.Connection]]:
+        with ExitStack() as stack:
+            yield [stack.enter_context(self._bounded(path, deadline)) for path in paths]
+
+    def _wal_checkpoint(self, path: str, deadline: float) -> Tuple[str, str]:
+        # PASSIVE copies what it can without waiting for readers or writers
+        with self._bounded(path, deadline) as conn:
+            busy, log_frames, checkpointed = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        if log_frames < 0:
+            return "skipped", "not in WAL mode"
+        return ("busy" if busy else "ok"), f"{checkpointed} of {log_frames} WAL frames checkpointed"
+
+    def _optimize(self, path: str, deadline: float) -> Tuple[str, str]:
+        with self._bounded(path, deadline) as conn:
+            conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+            conn.execute("PRAGMA optimize").fetchall()
+        return "ok", ""
+
+    def _analyze(self, path: str, deadline: float) -> Tuple[str, str]:
+        with self._bounded(path, deadline) as conn:
+            conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+            conn.execute("ANALYZE")
+            conn.commit()
+        return "ok", f"analysis_limit {ANALYSIS_LIMIT}"
+
+    def _incremental_vacuum(self, path: str, deadline: float) -> Tuple[str, str]:
+        with self._bounded(path, deadline) as conn:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                # Files created before auto_vacuum=INCREMENTAL need a one-off VACUUM to switch
+                return "skipped", "auto_vacuum is not INCREMENTAL"
+            free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free_before:
+                return "ok", "no free pages"
+            # executescript steps the pragma to completion; execute() frees a single page
+            conn.executescript(f"PRAGMA incremental_vacuum({int(Config.MAINTENANCE_VACUUM_PAGES)});")
+            free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return "ok", f"released {free_before - free_after} of {free_before} free pages"
+
+    def _cleanup_sessions(self, target: str, deadline: float) -> Tuple[str, str]:
+        with self._bounded_all(self._paths(target), deadline) as connections:
+            updated = self.db_manager.cleanup_old_sessions(
+                Config.SESSION_RETENTION_DAYS, Config.MAINTENANCE_CLEANUP_BATCH, deadline, connections
+            )
+        if time.monotonic() >= deadline:
+            return "partial", f"{updated} sessions deactivated, stopped at budget"
+        return "ok", f"{updated} sessions deactivated"
+
+    def status(self) -> Dict:
+        """Whether the thread is running plus the last recorded run of every task"""
+        return {"running": self.running, "runs": self.db_manager.get_maintenance_runs()}
+
+def main():
+    from database.memory import DatabaseManager
+    scheduler = MaintenanceScheduler(DatabaseManager())
+    results = scheduler.run_pending(force=True)
+    scheduler.stop()
+    for result in results:
+        print(f"{result['task']:<20} {result['db_path']:<30} {result['status']:<12} "
+              f"{result['duration_ms']:8.1f}ms  {result['detail']}")
+    sys.exit(1 if any(result["status"] == "error" for result in results) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,55 @@
+import os
 import sqlite3
 import json
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Any
 import streamlit as st
 from config.settings import Config
+from database.cache import QueryCache
+from database.maintenance import MaintenanceScheduler
+from database.profiling import connect_profiled
+from database.sharding import ShardRouter
+from services.cohort_stats import cohort_deltas, contribution, cohorts_for, summarize_cohort
+from services.skills import get_skill_index
+from utils.helpers import profile_hash
+from utils.profile_diff import diff_profiles
 
 class DatabaseManager:
     """Handles all database operations"""
     
     def __init__(self):
         self.db_path = Config.DB_PATH
+        self.router = ShardRouter(Config.DB_PATH, Config.DB_SHARD_COUNT)
+        self.query_cache = QueryCache(Config.QUERY_CACHE_SIZE, Config.QUERY_CACHE_TTL_SECONDS)
+        # Called as listener(user_id, profile_data, diff) after each profile save
+        self._profile_listeners: List[Callable[[str, Optional[Dict], Dict], None]] = []
+        # Called as listener(user_id) after a user's data is cleared
+        self._clear_listeners: List[Callable[[str], None]] = []
         self.init_database()
     
     def init_database(self) -> sqlite3.Connection:
-        """Initialize SQLite database with required tables"""
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        """Initialize the base database and every shard with required tables"""
+        for path in self.router.all_paths:
+            if path != self.db_path:
+                self._init_schema(self._connect(path)).close()
+        return self._init_schema(self.get_connection())
+    
+    def _init_schema(self, conn: sqlite3.Connection) -> sqlite3.Connection:
         cursor = conn.cursor()
         
+        # Lets maintenance return free pages in small steps; only takes effect on new files
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        
+        # WAL lets readers proceed while a writer holds the lock
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
+        # profile_prefetch was first keyed by profile_hash alone, so users with
+        # identical profiles shared a row; its rows are speculative and regenerated
+        cursor.execute("PRAGMA table_info(profile_prefetch)")
+        if [row[1] for row in cursor.fetchall() if row[5]] == ["profile_hash"]:
+            cursor.execute("DROP TABLE profile_prefetch")
+        
         # no dropping existing data
         cursor.executescript('''
             CREATE TABLE IF NOT EXISTS user_profiles (
@@ -39,6 +72,10 @@ class DatabaseManager:
                 agent_used TEXT,
                 timestamp TIMESTAMP,
                 context_data TEXT,
+                prompt_tokens INTEGER DEFAULT 0,
+                completion_tokens INTEGER DEFAULT 0,
+                model TEXT,
+                latency_ms REAL,
                 FOREIGN KEY (user_id) REFERENCES user_profiles (user_id)
             );
             
@@ -51,23 +88,171 @@ class DatabaseManager:
                 is_active BOOLEAN DEFAULT 1,
                 FOREIGN KEY (user_id) REFERENCES user_profiles (user_id)
             );
+            
+            CREATE TABLE IF NOT EXISTS profile_prefetch (
+                profile_hash TEXT,
+                user_id TEXT,
+                agent_used TEXT,
+                response TEXT,
+                usage_data TEXT,
+                created_at TIMESTAMP,
+                PRIMARY KEY (user_id, profile_hash)
+            );
+            
+            CREATE TABLE IF NOT EXISTS usage_overhead (
+                user_id TEXT,
+                timestamp TIMESTAMP,
+                model TEXT,
+                prompt_tokens INTEGER DEFAULT 0,
+                completion_tokens INTEGER DEFAULT 0
+            );
+            
+            CREATE TABLE IF NOT EXISTS profile_versions (
+                user_id TEXT,
+                version INTEGER,
+                profile_hash TEXT,
+                profile_data TEXT,
+                changed_sections TEXT,
+                diff TEXT,
+                analysis TEXT,
+                created_at TIMESTAMP,
+                PRIMARY KEY (user_id, version)
+            );
+            
+            CREATE TABLE IF NOT EXISTS cohort_members (
+                user_id TEXT PRIMARY KEY,
+                contribution TEXT,
+                updated_at TIMESTAMP
+            );
+            
+            CREATE TABLE IF NOT EXISTS cohort_sizes (
+                cohort TEXT PRIMARY KEY,
+                members INTEGER DEFAULT 0
+            );
+            
+            CREATE TABLE IF NOT EXISTS cohort_histograms (
+                cohort TEXT,
+                metric TEXT,
+                bucket INTEGER,
+                count INTEGER DEFAULT 0,
+                PRIMARY KEY (cohort, metric, bucket)
+            );
+            
+            CREATE TABLE IF NOT EXISTS cohort_skills (
+                cohort TEXT,
+                skill_id INTEGER,
+                count INTEGER DEFAULT 0,
+                PRIMARY KEY (cohort, skill_id)
+            );
+            
+            CREATE TABLE IF NOT EXISTS maintenance_runs (
+                task TEXT,
+                db_path TEXT,
+                last_started_at TIMESTAMP,
+                last_duration_ms REAL,
+                last_status TEXT,
+                last_detail TEXT,
+                run_count INTEGER DEFAULT 0,
+                PRIMARY KEY (task, db_path)
+            );
+            
+            CREATE TABLE IF NOT EXISTS question_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                agent_used TEXT,
+                question TEXT,
+                signature BLOB,
+                response TEXT,
+                usage_data TEXT,
+                hits INTEGER DEFAULT 0,
+                created_at TIMESTAMP,
+                last_hit_at TIMESTAMP
+            );
+            
+            CREATE INDEX IF NOT EXISTS idx_profile_prefetch_user
+                ON profile_prefetch (user_id);
+            
+            CREATE INDEX IF NOT EXISTS idx_user_interactions_user_time
+                ON user_interactions (user_id, timestamp);
+            
+            CREATE INDEX IF NOT EXISTS idx_user_interactions_time
+                ON user_interactions (timestamp);
+            
+            CREATE INDEX IF NOT EXISTS idx_user_sessions_user_activity
+                ON user_sessions (user_id, last_activity);
+            
+            CREATE INDEX IF NOT EXISTS idx_user_sessions_activity
+                ON user_sessions (last_activity);
+            
+            CREATE INDEX IF NOT EXISTS idx_usage_overhead_user_time
+                ON usage_overhead (user_id, timestamp);
+            
+            CREATE INDEX IF NOT EXISTS idx_cohort_skills_count
+                ON cohort_skills (cohort, count);
         ''')
         
+        # Columns added after the first release
+        self._ensure_columns(cursor, "user_interactions", {
+            "prompt_tokens": "INTEGER DEFAULT 0",
+            "completion_tokens": "INTEGER DEFAULT 0",
+            "model": "TEXT",
+            "latency_ms": "REAL"
+        })
+        self._ensure_columns(cursor, "profile_prefetch", {"usage_data": "TEXT"})
+        
         conn.commit()
         return conn
     
-    def get_connection(self) -> sqlite3.Connection:
-        """Get database connection"""
-        return sqlite3.connect(self.db_path, check_same_thread=False)
+    def _ensure_columns(self, cursor: sqlite3.Cursor, table: str, columns: Dict[str, str]) -> None:
+        """Add any missing columns to an existing table"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        for name, definition in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+    
+    def get_connection(self, user_id: Optional[str] = None) -> sqlite3.Connection:
+        """Get a connection to the user's shard, or to the base database"""
+        return self._connect(self.router.path_for(user_id) if user_id else self.db_path)
+    
+    def _connect(self, path: str) -> sqlite3.Connection:
+        if Config.DB_PROFILING:
+            conn = connect_profiled(path)
+        else:
+            conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {int(Config.DB_BUSY_TIMEOUT_MS)}")
+        return conn
+    
+    def iter_shard_connections(self):
+        """Yield a connection to each shard for cross-shard operations"""
+        for path in self.router.shard_paths:
+            conn = self._connect(path)
+            try:
+                yield conn
+            finally:
+                conn.close()
     
     def save_user_profile(self, user_id: str, profile_data: Optional[Dict], 
                          career_goals: Optional[List] = None, 
-                         preferences: Optional[Dict] = None) -> None:
-        """Save user profile to database"""
-        conn = self.get_connection()
+                         preferences: Optional[Dict] = None) -> Dict:
+        """Save user profile to database and return its field-level diff.
+        
+        Skills are tagged with taxonomy ids in place, so the caller's
+        profile_data matches what is stored (and hashes the same). A changed
+        profile is also recorded in profile_versions and reported to the
+        profile listeners.
+        """
+        get_skill_index().canonicalize_profile(profile_data)
+        conn = self.get_connection(user_id)
         cursor = conn.cursor()
         now = datetime.now().isoformat()
         
+        cursor.execute('''
+            SELECT profile_data FROM user_profiles WHERE user_id = ?
+        ''', (user_id,))
+        result = cursor.fetchone()
+        previous = json.loads(result[0]) if result and result[0] else None
+        diff = diff_profiles(previous, profile_data)
+        
         cursor.execute('''
             INSERT OR REPLACE INTO user_profiles 
             (user_id, profile_data, career_goals, preferences, created_at, updated_at, last_active)
@@ -80,12 +265,220 @@ class DatabaseManager:
             user_id, now, now, now
         ))
         
+        # Prefetched results for any previous version of the profile are stale
+        cursor.execute('''
+            DELETE FROM profile_prefetch WHERE user_id = ? AND profile_hash != ?
+        ''', (user_id, profile_hash(profile_data) if profile_data else ""))
+        
+        if diff["changed_sections"]:
+            self._save_profile_version(cursor, user_id, profile_data, diff, now)
+        
         conn.commit()
         conn.close()
+        self.query_cache.invalidate_user(user_id)
+        
+        if Config.COHORT_STATS_ENABLED:
+            self.update_cohort_stats(user_id, profile_data)
+        
+        if diff["changed_sections"]:
+            for listener in self._profile_listeners:
+                try:
+                    listener(user_id, profile_data, diff)
+                except Exception as e:
+                    print(f"⚠️ Profile listener failed for {user_id}: {e}")
+        return diff
+    
+    def _save_profile_version(self, cursor: sqlite3.Cursor, user_id: str, profile_data: Optional[Dict],
+                              diff: Dict, now: str) -> None:
+        cursor.execute('''
+            SELECT COALESCE(MAX(version), 0) FROM profile_versions WHERE user_id = ?
+        ''', (user_id,))
+        version = cursor.fetchone()[0] + 1
+        
+        cursor.execute('''
+            INSERT INTO profile_versions
+            (user_id, version, profile_hash, profile_data, changed_sections, diff, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            user_id, version,
+            profile_hash(profile_data) if profile_data else None,
+            json.dumps(profile_data) if profile_data else None,
+            json.dumps(diff["changed_sections"]),
+            json.dumps(diff["fields"]),
+            now
+        ))
+        
+        # Keep a bounded history per user
+        cursor.execute('''
+            DELETE FROM profile_versions WHERE user_id = ? AND version <= ?
+        ''', (user_id, version - Config.PROFILE_VERSION_RETENTION))
+    
+    def add_profile_listener(self, listener: Callable[[str, Optional[Dict], Dict], None]) -> None:
+        """Register a callback run after a profile save that changed something"""
+        self._profile_listeners.append(listener)
+    
+    def add_clear_listener(self, listener: Callable[[str], None]) -> None:
+        """Register a callback run after a user's data is cleared"""
+        self._clear_listeners.append(listener)
+    
+    def update_cohort_stats(self, user_id: str, profile_data: Optional[Dict]) -> bool:
+        """Move the user's contribution in the shared cohort aggregates to profile_data.
+        
+        Only the buckets and skill counters that differ are touched; returns
+        False when nothing changed.
+        """
+        new = contribution(profile_data)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT contribution FROM cohort_members WHERE user_id = ?", (user_id,))
+        result = cursor.fetchone()
+        if (json.loads(result[0]) if result else None) == new:
+            conn.close()
+            return False
+        
+        # Re-read under the write lock so concurrent saves of one user cannot double count
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT contribution FROM cohort_members WHERE user_id = ?", (user_id,))
+        result = cursor.fetchone()
+        deltas = cohort_deltas(json.loads(result[0]) if result else None, new)
+        
+        cursor.executemany('''
+            INSERT INTO cohort_sizes (cohort, members) VALUES (?, ?)
+            ON CONFLICT (cohort) DO UPDATE SET members = members + excluded.members
+        ''', deltas["sizes"].items())
+        cursor.executemany('''
+            INSERT INTO cohort_histograms (cohort, metric, bucket, count) VALUES (?, ?, ?, ?)
+            ON CONFLICT (cohort, metric, bucket) DO UPDATE SET count = count + excluded.count
+        ''', [key + (d,) for key, d in deltas["histograms"].items()])
+        cursor.executemany('''
+            INSERT INTO cohort_skills (cohort, skill_id, count) VALUES (?, ?, ?)
+            ON CONFLICT (cohort, skill_id) DO UPDATE SET count = count + excluded.count
+        ''', [key + (d,) for key, d in deltas["skills"].items()])
+        
+        # Drop emptied rows so the per-cohort reads stay small
+        cursor.executemany('''
+            DELETE FROM cohort_histograms WHERE cohort = ? AND metric = ? AND bucket = ? AND count <= 0
+        ''', [key for key, d in deltas["histograms"].items() if d < 0])
+        cursor.executemany('''
+            DELETE FROM cohort_skills WHERE cohort = ? AND skill_id = ? AND count <= 0
+        ''', [key for key, d in deltas["skills"].items() if d < 0])
+        
+        if new is None:
+            cursor.execute("DELETE FROM cohort_members WHERE user_id = ?", (user_id,))
+        else:
+            cursor.execute('''
+                INSERT OR REPLACE INTO cohort_members (user_id, contribution, updated_at)
+                VALUES (?, ?, ?)
+            ''', (user_id, json.dumps(new), datetime.now().isoformat()))
+        conn.commit()
+        conn.close()
+        return True
+    
+    def get_cohort_percentiles(self, profile_data: Optional[Dict]) -> Optional[Dict]:
+        """Percentiles of a profile's metrics within its most specific cohort
+        that has at least COHORT_MIN_SIZE members, or None if none does"""
+        if not profile_data:
+            return None
+        cohorts = cohorts_for(profile_data)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT cohort, members FROM cohort_sizes
+            WHERE cohort IN ({", ".join("?" * len(cohorts))})
+        ''', cohorts)
+        sizes = dict(cursor.fetchall())
+        cohort = next((c for c in cohorts if sizes.get(c, 0) >= Config.COHORT_MIN_SIZE), None)
+        if cohort is None:
+            conn.close()
+            return None
+        
+        cursor.execute('''
+            SELECT metric, bucket, count FROM cohort_histograms WHERE cohort = ?
+        ''', (cohort,))
+        histograms = {}
+        for metric, bucket, count in cursor.fetchall():
+            histograms.setdefault(metric, {})[bucket] = count
+        
+        cursor.execute('''
+            SELECT skill_id, count FROM cohort_skills
+            WHERE cohort = ?
+            ORDER BY count DESC
+            LIMIT ?
+        ''', (cohort, Config.COHORT_TOP_SKILLS))
+        top_skills = cursor.fetchall()
+        conn.close()
+        
+        index = get_skill_index()
+        return summarize_cohort(cohort, sizes[cohort], histograms, top_skills, profile_data,
+                                index.skill_ids(profile_data), index.names)
+    
+    def reset_cohort_stats(self) -> None:
+        """Empty the cohort aggregates, e.g. before a full rebuild"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        for table in ("cohort_members", "cohort_sizes", "cohort_histograms", "cohort_skills"):
+            cursor.execute(f"DELETE FROM {table}")
+        conn.commit()
+        conn.close()
+    
+    def get_profile_versions(self, user_id: str, limit: int = 10) -> List[Dict]:
+        """Recent profile versions with their changed sections, newest first"""
+        conn = self.get_connection(user_id)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT version, changed_sections, diff, created_at, analysis IS NOT NULL
+            FROM profile_versions
+            WHERE user_id = ?
+            ORDER BY version DESC
+            LIMIT ?
+        ''', (user_id, limit))
+        
+        results = cursor.fetchall()
+        conn.close()
+        
+        return [
+            {
+                'version': row[0],
+                'changed_sections': json.loads(row[1]) if row[1] else [],
+                'fields': json.loads(row[2]) if row[2] else {},
+                'created_at': row[3],
+                'has_analysis': bool(row[4])
+            }
+            for row in results
+        ]
+    
+    def get_latest_profile_analysis(self, user_id: str) -> Optional[Dict]:
+        """The newest profile version that has a stored profile review, if any"""
+        conn = self.get_connection(user_id)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT version, profile_hash, profile_data, analysis
+            FROM profile_versions
+            WHERE user_id = ? AND analysis IS NOT NULL
+            ORDER BY version DESC
+            LIMIT 1
+        ''', (user_id,))
+        
+        result = cursor.fetchone()
+        conn.close()
+        
+        if not result:
+            return None
+        return {
+            'version': result[0],
+            'profile_hash': result[1],
+            'profile_data': json.loads(result[2]) if result[2] else None,
+            'analysis': result[3]
+        }
     
     def load_user_profile(self, user_id: str) -> Tuple[Optional[Dict], List, Dict]:
         """Load user profile from database"""
-        conn = self.get_connection()
+        return self.query_cache.get_or_load(
+            user_id, ("profile",), lambda: self._load_user_profile(user_id)
+        )
+    
+    def _load_user_profile(self, user_id: str) -> Tuple[Optional[Dict], List, Dict]:
+        conn = self.get_connection(user_id)
         cursor = conn.cursor()
         cursor.execute('''
             SELECT profile_data, career_goals, preferences 
@@ -106,14 +499,17 @@ class DatabaseManager:
         return None, [], {}
     
     def save_interaction(self, user_id: str, query: str, response: str, agent_used: str, 
-                        session_id: str = None, context_data: Dict = None) -> None:
-        """Save user interaction to database with session tracking"""
-        conn = self.get_connection()
+                        session_id: str = None, context_data: Dict = None,
+                        usage: Dict = None) -> None:
+        """Save user interaction to database with session tracking and token usage"""
+        conn = self.get_connection(user_id)
         cursor = conn.cursor()
+        usage = usage or {}
         
         cursor.execute('''
-            INSERT INTO user_interactions (user_id, session_id, interaction_type, query, response, agent_used, timestamp, context_data)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO user_interactions (user_id, session_id, interaction_type, query, response, agent_used, timestamp, context_data,
+                                           prompt_tokens, completion_tokens, model, latency_ms)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             user_id, 
             session_id or "default", 
@@ -122,7 +518,11 @@ class DatabaseManager:
             response, 
             agent_used, 
             datetime.now().isoformat(),
-            json.dumps(context_data) if context_data else None
+            json.dumps(context_data) if context_data else None,
+            usage.get("prompt_tokens", 0),
+            usage.get("completion_tokens", 0),
+            usage.get("model"),
+            usage.get("latency_ms")
         ))
         
         # Update last active time
@@ -132,10 +532,17 @@ class DatabaseManager:
         
         conn.commit()
         conn.close()
+        self.query_cache.invalidate_user(user_id)
     
     def get_user_interaction_history(self, user_id: str, limit: int = 10, days_back: int = 30) -> List[Dict]:
         """Get recent user interactions within specified timeframe"""
-        conn = self.get_connection()
+        return self.query_cache.get_or_load(
+            user_id, ("history", limit, days_back),
+            lambda: self._get_user_interaction_history(user_id, limit, days_back)
+        )
+    
+    def _get_user_interaction_history(self, user_id: str, limit: int, days_back: int) -> List[Dict]:
+        conn = self.get_connection(user_id)
         cursor = conn.cursor()
         
         # Get interactions from last N days
@@ -166,7 +573,7 @@ class DatabaseManager:
     
     def save_session_data(self, session_id: str, user_id: str, session_data: Dict) -> None:
         """Save session data for persistence"""
-        conn = self.get_connection()
+        conn = self.get_connection(user_id)
         cursor = conn.cursor()
         now = datetime.now().isoformat()
         
@@ -178,24 +585,35 @@ class DatabaseManager:
         
         conn.commit()
         conn.close()
+        self.query_cache.invalidate_user(user_id)
     
-    def load_session_data(self, session_id: str) -> Optional[Dict]:
-        """Load session data"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT session_data FROM user_sessions 
-            WHERE session_id = ? AND is_active = 1
-        ''', (session_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
+    def load_session_data(self, session_id: str, user_id: Optional[str] = None) -> Optional[Dict]:
+        """Load session data; without user_id every shard is searched"""
+        connections = [self.get_connection(user_id)] if user_id else self.iter_shard_connections()
+        for conn in connections:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT session_data FROM user_sessions 
+                WHERE session_id = ? AND is_active = 1
+            ''', (session_id,))
+            
+            result = cursor.fetchone()
+            if user_id:
+                conn.close()
+            if result:
+                return json.loads(result[0])
         
-        return json.loads(result[0]) if result else None
+        return None
     
     def get_active_sessions_for_user(self, user_id: str, limit: int = 5) -> List[Dict]:
         """Get recent active sessions for a user"""
-        conn = self.get_connection()
+        return self.query_cache.get_or_load(
+            user_id, ("sessions", limit),
+            lambda: self._get_active_sessions_for_user(user_id, limit)
+        )
+    
+    def _get_active_sessions_for_user(self, user_id: str, limit: int) -> List[Dict]:
+        conn = self.get_connection(user_id)
         cursor = conn.cursor()
         cursor.execute('''
             SELECT session_id, created_at, last_activity 
@@ -219,32 +637,383 @@ class DatabaseManager:
     
     def clear_user_data(self, user_id: str) -> None:
         """Clear all user data from database"""
-        conn = self.get_connection()
+        conn = self.get_connection(user_id)
         cursor = conn.cursor()
         cursor.execute("DELETE FROM user_interactions WHERE user_id = ?", (user_id,))
         cursor.execute("DELETE FROM user_profiles WHERE user_id = ?", (user_id,))
         cursor.execute("DELETE FROM user_sessions WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM profile_prefetch WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM profile_versions WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM usage_overhead WHERE user_id = ?", (user_id,))
         conn.commit()
         conn.close()
+        self.query_cache.invalidate_user(user_id)
+        if Config.COHORT_STATS_ENABLED:
+            self.update_cohort_stats(user_id, None)
+        
+        for listener in self._clear_listeners:
+            try:
+                listener(user_id)
+            except Exception as e:
+                print(f"⚠️ Clear listener failed for {user_id}: {e}")
+    
+    def save_prefetched_response(self, user_id: str, digest: str, agent_used: str, response: str,
+                                 usage: Dict = None) -> None:
+        """Store a speculatively generated response for a profile version"""
+        conn = self.get_connection(user_id)
+        cursor = conn.cursor()
+        
+        # Only store if the profile has not changed while the response was generated
+        cursor.execute('''
+            SELECT profile_data FROM user_profiles WHERE user_id = ?
+        ''', (user_id,))
+        result = cursor.fetchone()
+        
+        if result and result[0] and profile_hash(json.loads(result[0])) == digest:
+            cursor.execute('''
+                INSERT OR REPLACE INTO profile_prefetch 
+                (profile_hash, user_id, agent_used, response, usage_data, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (digest, user_id, agent_used, response,
+                  json.dumps(usage) if usage else None, datetime.now().isoformat()))
+            
+            # Kept with the version so later edits can be re-analyzed incrementally
+            cursor.execute('''
+                UPDATE profile_versions SET analysis = ? WHERE user_id = ? AND profile_hash = ?
+            ''', (response, user_id, digest))
+            conn.commit()
+        
+        conn.close()
+    
+    def has_prefetched_response(self, user_id: str, digest: str) -> bool:
+        """Check whether a prefetched response exists for a profile version"""
+        conn = self.get_connection(user_id)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT 1 FROM profile_prefetch WHERE user_id = ? AND profile_hash = ?
+        ''', (user_id, digest))
+        
+        result = cursor.fetchone()
+        conn.close()
+        
+        return result is not None
+    
+    def take_prefetched_response(self, user_id: str, digest: str) -> Optional[Tuple[str, Dict]]:
+        """Return and remove the prefetched response and its token usage for a profile version"""
+        conn = self.get_connection(user_id)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT response, usage_data FROM profile_prefetch WHERE user_id = ? AND profile_hash = ?
+        ''', (user_id, digest))
+        result = cursor.fetchone()
+        
+        if result:
+            cursor.execute('''
+                DELETE FROM profile_prefetch WHERE user_id = ? AND profile_hash = ?
+            ''', (user_id, digest))
+            conn.commit()
+        
+        conn.close()
+        
+        return (result[0], json.loads(result[1]) if result[1] else {}) if result else None
     
-    def cleanup_old_sessions(self, days_old: int = 30) -> None:
-        """Clean up old inactive sessions"""
+    def load_question_cache(self, max_age_days: int) -> List[Dict]:
+        """Load shared question-cache entries newer than max_age_days, least recently used first"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cutoff_date = (datetime.now() - timedelta(days=days_old)).isoformat()
+        cutoff_date = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+        
+        cursor.execute("DELETE FROM question_cache WHERE created_at <= ?", (cutoff_date,))
+        conn.commit()
         
         cursor.execute('''
-            UPDATE user_sessions SET is_active = 0 
-            WHERE last_activity < ?
+            SELECT id, agent_used, question, signature, response, usage_data, hits, created_at
+            FROM question_cache
+            WHERE created_at > ?
+            ORDER BY COALESCE(last_hit_at, created_at)
         ''', (cutoff_date,))
         
+        results = cursor.fetchall()
+        conn.close()
+        
+        return [
+            {
+                'id': row[0],
+                'agent_used': row[1],
+                'question': row[2],
+                'signature': row[3],
+                'response': row[4],
+                'usage': json.loads(row[5]) if row[5] else {},
+                'hits': row[6] or 0,
+                'created_at': row[7]
+            }
+            for row in results
+        ]
+    
+    def save_question_cache_entry(self, agent_used: str, question: str, signature: bytes,
+                                  response: str, usage: Dict = None) -> int:
+        """Store a shared answer to a generic question and return its id"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO question_cache
+            (agent_used, question, signature, response, usage_data, hits, created_at)
+            VALUES (?, ?, ?, ?, ?, 0, ?)
+        ''', (agent_used, question, signature, response,
+              json.dumps(usage) if usage else None, datetime.now().isoformat()))
+        entry_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        return entry_id
+    
+    def record_question_cache_hits(self, hits: Dict[int, Tuple[int, str]]) -> None:
+        """Add hit counts and last-hit times, keyed by entry id"""
+        if not hits:
+            return
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.executemany('''
+            UPDATE question_cache SET hits = hits + ?, last_hit_at = ? WHERE id = ?
+        ''', [(count, last_hit_at, entry_id) for entry_id, (count, last_hit_at) in hits.items()])
+        conn.commit()
+        conn.close()
+    
+    def delete_question_cache_entries(self, entry_ids: List[int]) -> None:
+        """Remove evicted or expired question-cache entries"""
+        if not entry_ids:
+            return
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.executemany("DELETE FROM question_cache WHERE id = ?", [(entry_id,) for entry_id in entry_ids])
+        conn.commit()
+        conn.close()
+    
+    def get_tokens_used_today(self, user_id: str) -> int:
+        """Get total prompt and completion tokens used by a user since midnight"""
+        day_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+        return self.query_cache.get_or_load(
+            user_id, ("tokens_today", day_start),
+            lambda: self._get_tokens_used_since(user_id, day_start)
+        )
+    
+    def _get_tokens_used_since(self, user_id: str, since: str) -> int:
+        conn = self.get_connection(user_id)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0)
+            FROM user_interactions 
+            WHERE user_id = ? AND timestamp >= ?
+        ''', (user_id, since))
+        interactions = cursor.fetchone()[0]
+        
+        cursor.execute('''
+            SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0)
+            FROM usage_overhead
+            WHERE user_id = ? AND timestamp >= ?
+        ''', (user_id, since))
+        overhead = cursor.fetchone()[0]
+        conn.close()
+        
+        return interactions + overhead
+    
+    def record_extra_usage(self, user_id: str, usage: Dict) -> None:
+        """Charge tokens of an LLM request not saved as an interaction (unused or prefetched) to the user's quota"""
+        conn = self.get_connection(user_id)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO usage_overhead (user_id, timestamp, model, prompt_tokens, completion_tokens)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (user_id, datetime.now().isoformat(), usage.get("model"),
+              usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)))
+        conn.commit()
+        conn.close()
+        self.query_cache.invalidate_user(user_id)
+    
+    def get_usage_rollup(self, user_id: Optional[str] = None, days_back: int = 30) -> List[Dict]:
+        """Get token and latency totals per user and agent, across shards"""
+        cutoff_date = (datetime.now() - timedelta(days=days_back)).isoformat()
+        
+        if user_id:
+            conn = self.get_connection(user_id)
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT user_id, agent_used, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), AVG(latency_ms)
+                FROM user_interactions 
+                WHERE user_id = ? AND timestamp > ?
+                GROUP BY user_id, agent_used
+            ''', (user_id, cutoff_date))
+            results = cursor.fetchall()
+            conn.close()
+        else:
+            results = []
+            for conn in self.iter_shard_connections():
+                cursor = conn.cursor()
+                # Without the hint the planner walks the whole (user_id, timestamp) index for the GROUP BY
+                cursor.execute('''
+                    SELECT user_id, agent_used, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), AVG(latency_ms)
+                    FROM user_interactions INDEXED BY idx_user_interactions_time
+                    WHERE timestamp > ?
+                    GROUP BY user_id, agent_used
+                ''', (cutoff_date,))
+                results.extend(cursor.fetchall())
+        
+        return [
+            {
+                'user_id': row[0],
+                'agent_used': row[1],
+                'calls': row[2],
+                'prompt_tokens': row[3] or 0,
+                'completion_tokens': row[4] or 0,
+                'avg_latency_ms': row[5] or 0.0
+            }
+            for row in results
+        ]
+    
+    def cleanup_old_sessions(self, days_old: int = 30, batch_size: Optional[int] = None,
+                             deadline: Optional[float] = None,
+                             connections: Optional[Iterable[sqlite3.Connection]] = None) -> int:
+        """Mark old sessions inactive on every shard and return how many changed.
+        
+        With batch_size the update is committed in batches so foreground
+        writers can take the lock in between; work stops at deadline (an
+        absolute time.monotonic() value) and continues on the next call.
+        Background callers pass connections (one per shard) with a short busy
+        timeout and a progress handler that interrupts a batch at the deadline.
+        """
+        cutoff_date = (datetime.now() - timedelta(days=days_old)).isoformat()
+        updated = 0
+        
+        try:
+            for conn in (self.iter_shard_connections() if connections is None else connections):
+                cursor = conn.cursor()
+                while True:
+                    try:
+                        if batch_size:
+                            cursor.execute('''
+                                UPDATE user_sessions SET is_active = 0
+                                WHERE rowid IN (
+                                    SELECT rowid FROM user_sessions
+                                    WHERE last_activity < ? AND is_active = 1
+                                    LIMIT ?
+                                )
+                            ''', (cutoff_date, batch_size))
+                        else:
+                            cursor.execute('''
+                                UPDATE user_sessions SET is_active = 0 
+                                WHERE last_activity < ? AND is_active = 1
+                            ''', (cutoff_date,))
+                        conn.commit()
+                    except sqlite3.OperationalError:
+                        if deadline is None or time.monotonic() < deadline:
+                            raise
+                        # Interrupted at the deadline: the batch rolled back, earlier ones are kept
+                        conn.rollback()
+                        break
+                    updated += cursor.rowcount
+                    if not batch_size or cursor.rowcount < batch_size:
+                        break
+                    if deadline is not None and time.monotonic() >= deadline:
+                        break
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+        finally:
+            if updated:
+                self.query_cache.invalidate_all()
+        return updated
+    
+    def record_maintenance_run(self, task: str, db_path: str, started_at: str,
+                               duration_ms: float, status: str, detail: str = "") -> None:
+        """Store the outcome of a maintenance task run"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO maintenance_runs
+            (task, db_path, last_started_at, last_duration_ms, last_status, last_detail, run_count)
+            VALUES (?, ?, ?, ?, ?, ?, 1)
+            ON CONFLICT (task, db_path) DO UPDATE SET
+                last_started_at = excluded.last_started_at,
+                last_duration_ms = excluded.last_duration_ms,
+                last_status = excluded.last_status,
+                last_detail = excluded.last_detail,
+                run_count = run_count + 1
+        ''', (task, db_path, started_at, duration_ms, status, detail))
+        conn.commit()
+        conn.close()
+    
+    def get_maintenance_runs(self) -> List[Dict]:
+        """Last run of every maintenance task on every database file"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT task, db_path, last_started_at, last_duration_ms, last_status, last_detail, run_count
+            FROM maintenance_runs
+            ORDER BY task, db_path
+        ''')
+        results = cursor.fetchall()
+        conn.close()
+        
+        return [
+            {
+                'task': row[0],
+                'db_path': row[1],
+                'last_started_at': row[2],
+                'last_duration_ms': row[3],
+                'last_status': row[4],
+                'last_detail': row[5],
+                'run_count': row[6]
+            }
+            for row in results
+        ]
+    
+    def get_storage_stats(self) -> List[Dict]:
+        """Get row counts and file size for each shard"""
+        stats = []
+        for path, conn in zip(self.router.shard_paths, self.iter_shard_connections()):
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM user_profiles")
+            profiles = cursor.fetchone()[0]
+            cursor.execute("/* allow-scan: admin statistics */ SELECT COUNT(*) FROM user_interactions")
+            interactions = cursor.fetchone()[0]
+            cursor.execute("/* allow-scan: admin statistics */ SELECT COUNT(*) FROM user_sessions")
+            sessions = cursor.fetchone()[0]
+            stats.append({
+                'path': path,
+                'profiles': profiles,
+                'interactions': interactions,
+                'sessions': sessions,
+                'size_bytes': sum(
+                    os.path.getsize(f) for f in (path, path + "-wal") if os.path.exists(f)
+                )
+            })
+        return stats
+    
+    def export_all_users(self):
+        """Yield every user's profile and interactions, shard by shard"""
+        for conn in self.iter_shard_connections():
+            cursor = conn.cursor()
+            cursor.execute("SELECT user_id FROM user_profiles")
+            user_ids = [row[0] for row in cursor.fetchall()]
+            for user_id in user_ids:
+                profile_data, career_goals, preferences = self._load_user_profile(user_id)
+                yield {
+                    'user_id': user_id,
+                    'profile_data': profile_data,
+                    'career_goals': career_goals,
+                    'preferences': preferences,
+                    'interactions': self._get_user_interaction_history(user_id, -1, 36500)
+                }
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get read-through query cache statistics"""
+        return self.query_cache.stats()
 
 @st.cache_resource
 def init_memory_system():
     """Initialize memory system with database"""
     from langgraph.checkpoint.memory import MemorySaver
     db_manager = DatabaseManager()
+    if Config.MAINTENANCE_ENABLED:
+        # One scheduler per process; init_memory_system is a cached resource
+        db_manager.maintenance = MaintenanceScheduler(db_manager).start()
     memory_saver = MemorySaver()
     return memory_saver, db_manager
\ No newline at end of file
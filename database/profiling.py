@@ -0,0 +1,225 @@
+"""Opt-in SQL profiling for DatabaseManager.
+
+When Config.DB_PROFILING is enabled every connection is created with
+ProfilingConnection and a trace callback, statements are timed and aggregated
+by normalized SQL text, and statements above the threshold are written to the
+slow-query log. check_query_plans() runs EXPLAIN QUERY PLAN on every query in
+database/memory.py and flags table scans on the large tables.
+
+    python -m database.profiling
+"""
+import ast
+import logging
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+from config.settings import Config
+
+# Tables that grow with usage and must never be fully scanned
+SCAN_CHECKED_TABLES = ("user_interactions", "user_sessions")
+# Admin queries that must read every row opt out with this SQL comment
+ALLOW_SCAN_MARKER = "/* allow-scan"
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+# Traced SQL has bound NULLs expanded inline, so treat them like any literal
+_NULL_RE = re.compile(r"\bNULL\b", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and replace literals so similar statements aggregate together"""
+    sql = _STRING_LITERAL_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _NULL_RE.sub("?", sql)
+    return _WHITESPACE_RE.sub(" ", sql).strip()
+
+class QueryProfiler:
+    """Aggregates statement timings and writes the slow-query log"""
+
+    def __init__(self, slow_threshold_ms: float, slow_log_path: Optional[str]):
+        self.slow_threshold_ms = slow_threshold_ms
+        self._stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.slow_logger = logging.getLogger("linkedin_optimizer.slow_query")
+        if slow_log_path and not self.slow_logger.handlers:
+            handler = logging.FileHandler(slow_log_path)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.slow_logger.addHandler(handler)
+            self.slow_logger.setLevel(logging.INFO)
+            self.slow_logger.propagate = False
+
+    def _entry(self, sql: str) -> Dict:
+        key = normalize_sql(sql)
+        entry = self._stats.get(key)
+        if entry is None:
+            entry = self._stats[key] = {"calls": 0, "traced": 0, "total_ms": 0.0, "max_ms": 0.0}
+        return entry
+
+    def trace(self, sql: str) -> None:
+        """sqlite3 trace callback; counts every statement the engine runs"""
+        with self._lock:
+            self._entry(sql)["traced"] += 1
+
+    def record(self, sql: str, elapsed_ms: float, new_call: bool = True) -> None:
+        with self._lock:
+            entry = self._entry(sql)
+            if new_call:
+                entry["calls"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+
+    def log_slow(self, sql: str, elapsed_ms: float) -> None:
+        self.slow_logger.info("%.1fms %s", elapsed_ms, normalize_sql(sql))
+
+    def snapshot(self) -> List[Dict]:
+        """Return aggregated statement stats, slowest total first"""
+        with self._lock:
+            rows = [
+                {"sql": sql, **entry,
+                 "avg_ms": entry["total_ms"] / entry["calls"] if entry["calls"] else 0.0}
+                for sql, entry in self._stats.items()
+            ]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+class ProfilingCursor(sqlite3.Cursor):
+    """Cursor that times execute and fetch calls for the profiler"""
+
+    profiler: QueryProfiler = None
+
+    def _timed(self, sql: str, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._last_sql = sql
+            self._last_elapsed_ms = elapsed_ms
+            self.profiler.record(sql, elapsed_ms)
+            if elapsed_ms >= self.profiler.slow_threshold_ms:
+                self.profiler.log_slow(sql, elapsed_ms)
+
+    def execute(self, sql, parameters=()):
+        return self._timed(sql, super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(sql, super().executemany, sql, seq_of_parameters)
+
+    def _timed_fetch(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            sql = getattr(self, "_last_sql", None)
+            if sql:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                before = self._last_elapsed_ms
+                self._last_elapsed_ms += elapsed_ms
+                self.profiler.record(sql, elapsed_ms, new_call=False)
+                threshold = self.profiler.slow_threshold_ms
+                if before < threshold <= self._last_elapsed_ms:
+                    self.profiler.log_slow(sql, self._last_elapsed_ms)
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+class ProfilingConnection(sqlite3.Connection):
+    """Connection whose cursors report timings to the profiler"""
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+_profiler: Optional[QueryProfiler] = None
+_profiler_lock = threading.Lock()
+
+def get_profiler() -> QueryProfiler:
+    """Process-wide profiler configured from Config"""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = QueryProfiler(Config.SLOW_QUERY_THRESHOLD_MS, Config.SLOW_QUERY_LOG_PATH)
+            ProfilingCursor.profiler = _profiler
+        return _profiler
+
+def connect_profiled(db_path: str) -> sqlite3.Connection:
+    """Open a connection with statement timing and tracing enabled"""
+    profiler = get_profiler()
+    conn = sqlite3.connect(db_path, check_same_thread=False, factory=ProfilingConnection)
+    conn.set_trace_callback(profiler.trace)
+    return conn
+
+def collect_module_queries(module_path: Optional[str] = None) -> List[str]:
+    """Find every SQL string passed to .execute() in the database module"""
+    module_path = module_path or os.path.join(os.path.dirname(__file__), "memory.py")
+    with open(module_path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    queries = []
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr == "execute" and node.args
+                and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+            sql = node.args[0].value.strip()
+            if not sql.upper().startswith(("CREATE", "PRAGMA", "ALTER", "DROP")):
+                queries.append(sql)
+    return queries
+
+def check_query_plans(conn: Optional[sqlite3.Connection] = None,
+                      tables=SCAN_CHECKED_TABLES) -> List[Dict]:
+    """EXPLAIN QUERY PLAN every module query and report full scans of the given tables.
+
+    Without a connection a throwaway database with the current schema is used.
+    Returns one entry per offending query; an empty list means all plans are fine.
+    """
+    temp_dir = None
+    if conn is None:
+        from database.memory import DatabaseManager
+        temp_dir = tempfile.TemporaryDirectory()
+        original_path = Config.DB_PATH
+        Config.DB_PATH = os.path.join(temp_dir.name, "plan_check.db")
+        try:
+            DatabaseManager()
+            conn = sqlite3.connect(Config.DB_PATH)
+        finally:
+            Config.DB_PATH = original_path
+
+    scan_re = re.compile(r"\bSCAN (?:TABLE )?(%s)\b" % "|".join(tables))
+    problems = []
+    try:
+        for sql in collect_module_queries():
+            params = (None,) * sql.count("?")
+            plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+            scans = [detail for detail in plan if scan_re.search(detail)]
+            if scans and ALLOW_SCAN_MARKER not in sql:
+                problems.append({"sql": normalize_sql(sql), "plan": plan, "scans": scans})
+    finally:
+        if temp_dir:
+            conn.close()
+            temp_dir.cleanup()
+    return problems
+
+def main():
+    problems = check_query_plans()
+    for problem in problems:
+        print(f"❌ {problem['sql']}")
+        for detail in problem["plan"]:
+            print(f"     {detail}")
+    print(f"{len(collect_module_queries())} queries checked, {len(problems)} with table scans")
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import hashlib
+import os
+from typing import List
+
+class ShardRouter:
+    """Maps each user_id to one of N SQLite files by a stable hash.
+
+    With a single shard the base database file is used directly, so existing
+    deployments keep working unchanged. With more shards the base file only
+    holds shared, non-user tables and user data lives in
+    <name>.shard<i><ext> next to it.
+    """
+
+    def __init__(self, base_path: str, shard_count: int = 1):
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+        self.base_path = base_path
+        self.shard_count = shard_count
+        if shard_count == 1:
+            self.shard_paths: List[str] = [base_path]
+        else:
+            stem, ext = os.path.splitext(base_path)
+            self.shard_paths = [f"{stem}.shard{i}{ext or '.db'}" for i in range(shard_count)]
+
+    def shard_index(self, user_id: str) -> int:
+        """Stable shard number for a user; independent of Python's hash seed"""
+        digest = hashlib.blake2b(user_id.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.shard_count
+
+    def path_for(self, user_id: str) -> str:
+        return self.shard_paths[self.shard_index(user_id)]
+
+    @property
+    def all_paths(self) -> List[str]:
+        """Every database file: the shared base file plus all shards"""
+        if self.base_path in self.shard_paths:
+            return list(self.shard_paths)
+        return [self.base_path] + self.shard_paths
@@ -18,7 +18,7 @@ def main():
     session_memory, db_manager = init_memory_system()
     agent_service = AgentService(db_manager)
     
-    sidebar_manager = SidebarManager(db_manager)
+    sidebar_manager = SidebarManager(db_manager, agent_service)
     chat_interface = ChatInterface(agent_service, db_manager)
     
     init_session_state()
@@ -36,6 +36,9 @@ def main():
     
     if not st.session_state.get('profile_data'):
         profile_data = chat_interface.render_profile_input()
+    elif st.session_state.get('editing_profile'):
+        # Edit the stored profile in place; unchanged entries are kept as they are
+        profile_data = chat_interface.render_profile_input(st.session_state.profile_data)
     else:
         # Show existing profile summary
         with st.expander("📋 Current Profile Summary", expanded=False):
@@ -45,7 +48,7 @@ def main():
             st.write(f"**Location:** {profile.get('location', 'N/A')}")
             
             if st.button("🔄 Update Profile"):
-                st.session_state.profile_data = None
+                st.session_state.editing_profile = True
                 st.rerun()
     
     # Render main chat interface with empty goals/preferences
@@ -0,0 +1,72 @@
+"""Tag the skills of every stored profile against the taxonomy.
+
+New saves are tagged by DatabaseManager.save_user_profile; this backfills
+profiles stored before that, or after aliases are added, shard by shard in
+batches. Changed profiles are written back through save_user_profile so each
+change is recorded in profile_versions and reaches the cohort statistics and
+profile listeners. Unchanged profiles are skipped, so the tool can be rerun
+safely.
+
+    python -m scripts.canonicalize_skills
+    python -m scripts.canonicalize_skills --dry-run
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import Config
+from database.memory import DatabaseManager
+from services.skills import get_skill_index
+
+BATCH_SIZE = 1000
+
+
+def canonicalize_shard(db_manager, conn, index, dry_run: bool) -> dict:
+    """Save changed profiles of one shard; returns scanned/changed counts"""
+    scanned = changed = 0
+    cursor = conn.execute("SELECT user_id, profile_data FROM user_profiles WHERE profile_data IS NOT NULL")
+    while True:
+        rows = cursor.fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+        for user_id, profile_json in rows:
+            scanned += 1
+            profile = json.loads(profile_json)
+            if index.canonicalize_profile(copy.deepcopy(profile)) == profile:
+                continue
+            changed += 1
+            if not dry_run:
+                _, career_goals, preferences = db_manager.load_user_profile(user_id)
+                db_manager.save_user_profile(user_id, profile, career_goals, preferences)
+    return {"scanned": scanned, "changed": changed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tag stored profile skills with taxonomy ids")
+    parser.add_argument("--db-path", help=f"Database file (default: {Config.DB_PATH})")
+    parser.add_argument("--dry-run", action="store_true", help="Report how many profiles would change")
+    args = parser.parse_args()
+
+    if args.db_path:
+        Config.DB_PATH = args.db_path
+    db_manager = DatabaseManager()
+    index = get_skill_index()
+
+    started = time.time()
+    scanned = changed = 0
+    for conn in db_manager.iter_shard_connections():
+        counts = canonicalize_shard(db_manager, conn, index, args.dry_run)
+        scanned += counts["scanned"]
+        changed += counts["changed"]
+
+    verb = "Would update" if args.dry_run else "Updated"
+    print(f"{verb} {changed} of {scanned} profiles in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Bulk-import LinkedIn data-export archives into the profile store.
+
+Archives are streamed one at a time; the user id defaults to the archive's
+file name without extension.
+
+    python -m scripts.import_linkedin_exports exports/*.zip
+    python -m scripts.import_linkedin_exports exports/ --user-prefix linkedin_
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import Config
+from database.memory import DatabaseManager
+from services.linkedin_import import default_user_id, import_exports
+
+
+def iter_archive_paths(sources):
+    for source in sources:
+        if os.path.isdir(source):
+            yield from sorted(glob.glob(os.path.join(source, "**", "*.zip"), recursive=True))
+        else:
+            yield source
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import LinkedIn data-export ZIP archives")
+    parser.add_argument("sources", nargs="+", help="Archive files or directories containing archives")
+    parser.add_argument("--user-prefix", default="", help="Prefix added to each derived user id")
+    parser.add_argument("--db-path", help=f"Database file (default: {Config.DB_PATH})")
+    args = parser.parse_args()
+
+    if args.db_path:
+        Config.DB_PATH = args.db_path
+    db_manager = DatabaseManager()
+
+    started = time.time()
+    imported = failed = 0
+    results = import_exports(
+        db_manager,
+        iter_archive_paths(args.sources),
+        lambda path: args.user_prefix + default_user_id(path)
+    )
+    for result in results:
+        if result["ok"]:
+            imported += 1
+        else:
+            failed += 1
+            print(f"❌ {result['path']}: {result['error']}")
+
+    elapsed = time.time() - started
+    print(f"Imported {imported} archives ({failed} failed) in {elapsed:.1f}s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Concurrent-user load and soak test harness.
+
+Simulates N concurrent chatters, each driving AgentService.process_message and
+the DatabaseManager read/write mix of a Streamlit rerun, against a stub LLM
+with configurable latency, or against the real agent graph replaying a
+recorded LLM cassette. Runs fully offline.
+
+    python -m scripts.load_test --users 50 --duration 60
+    python -m scripts.load_test --users 50 --duration 60 --cassette llm_cassettes.db --replay-latency-scale 0
+    python -m scripts.load_test --users 20 --duration 3600 --report-interval 60
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The real agents module refuses to import without a key; the stub graph below
+# replaces it before any call is made, so no request ever leaves the box.
+os.environ.setdefault("GROQ_API_KEY", "offline-load-test")
+
+from langchain_core.messages import AIMessage
+from config.settings import Config
+from database.memory import DatabaseManager
+import services.agent_service as agent_service_module
+from services.cassette import CassetteClient, CassetteStore
+from services.fallback import DEGRADED_NOTICE
+from services.agent_service import AgentService, DeadlineExceeded
+
+SAMPLE_QUESTIONS = [
+    "How can I improve my LinkedIn profile?",
+    "What jobs fit my background?",
+    "Help me write a better headline",
+    "Can you rewrite my summary to be more engaging?",
+    "Which skills am I missing for a senior role?",
+    "Is my experience section complete?",
+    "What career path makes sense for me?",
+    "How do I write a good headline?",
+    "What should a summary include?",
+]
+
+
+class StubGraph:
+    """Stands in for compiled_graph with a configurable response latency"""
+
+    def __init__(self, latency_ms: float, jitter: float, response_chars: int):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.response_chars = response_chars
+
+    def invoke(self, input_data, config=None):
+        delay = max(0.0, random.gauss(self.latency_ms, self.latency_ms * self.jitter)) / 1000
+        deadline = ((config or {}).get("configurable") or {}).get("deadline")
+        if deadline is not None and time.monotonic() + delay > deadline:
+            time.sleep(max(0.0, deadline - time.monotonic()))
+            raise DeadlineExceeded("Stub LLM did not respond before the turn deadline")
+        time.sleep(delay)
+        return {"messages": [AIMessage(content="x" * self.response_chars)]}
+
+
+def make_profile(user_index: int) -> Dict:
+    return {
+        "fullName": f"Load User {user_index}",
+        "headline": "Senior Software Engineer",
+        "location": "Seattle, WA",
+        "summary": "Engineer with experience in distributed systems. " * 5,
+        "experience": [
+            {"title": "Senior Software Engineer", "company": "Acme", "duration": "2020 - Present",
+             "description": "Building things"}
+        ],
+        "education": [{"school": "State University", "degree": "BSc", "year": "2018", "details": ""}],
+        "skills": [{"name": f"Skill {i}", "endorsements": 0} for i in range(15)],
+        "input_method": "manual"
+    }
+
+
+class LoadStats:
+    """Thread-safe collector for turn latencies and errors"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.turn_latencies: List[float] = []
+        self.read_latencies: List[float] = []
+        self.errors: Counter = Counter()
+        self.turns = 0
+        self.degraded = 0
+
+    def record_turn(self, seconds: float, degraded: bool = False):
+        with self.lock:
+            self.turn_latencies.append(seconds)
+            self.turns += 1
+            self.degraded += degraded
+
+    def record_read(self, seconds: float):
+        with self.lock:
+            self.read_latencies.append(seconds)
+
+    def record_error(self, error: Exception):
+        message = str(error)
+        if "database is locked" in message:
+            kind = "database_locked"
+        else:
+            kind = type(error).__name__
+        with self.lock:
+            self.errors[kind] += 1
+
+    def drain(self):
+        """Return and reset the samples collected since the last drain"""
+        with self.lock:
+            turns, reads = self.turn_latencies, self.read_latencies
+            self.turn_latencies, self.read_latencies = [], []
+            return turns, reads
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def simulate_user(user_index: int, db_manager: DatabaseManager, agent_service: AgentService,
+                  stats: LoadStats, stop_at: float, think_time: float, profile_update_rate: float):
+    """Drive one simulated chatter until the deadline"""
+    user_id = f"load_user_{user_index:05d}"
+    session_id = str(uuid.uuid4())
+    profile = make_profile(user_index)
+    chat_history: List[Dict] = []
+
+    try:
+        db_manager.save_user_profile(user_id, profile, [], {})
+    except sqlite3.Error as e:
+        stats.record_error(e)
+
+    while time.time() < stop_at:
+        time.sleep(random.expovariate(1 / think_time) if think_time > 0 else 0)
+        if time.time() >= stop_at:
+            break
+
+        # Reads performed on every Streamlit rerun (helpers + sidebar)
+        start = time.perf_counter()
+        try:
+            db_manager.load_user_profile(user_id)
+            db_manager.get_user_interaction_history(user_id, 20)
+            db_manager.get_user_interaction_history(user_id, 1000)
+            db_manager.get_user_interaction_history(user_id, 50, 7)
+            stats.record_read(time.perf_counter() - start)
+        except sqlite3.Error as e:
+            stats.record_error(e)
+            continue
+
+        if random.random() < profile_update_rate:
+            profile["headline"] = f"Senior Software Engineer #{random.randint(0, 999)}"
+            try:
+                db_manager.save_user_profile(user_id, profile, [], {})
+            except sqlite3.Error as e:
+                stats.record_error(e)
+
+        question = random.choice(SAMPLE_QUESTIONS)
+        chat_history.append({"role": "user", "content": question})
+        start = time.perf_counter()
+        try:
+            response, agent_info = agent_service.process_message(
+                question, chat_history, user_id, profile, [], {}, session_id=session_id
+            )
+            stats.record_turn(time.perf_counter() - start, response.startswith(DEGRADED_NOTICE))
+            chat_history.append({"role": "assistant", "content": response, "agent": agent_info["id"]})
+        except Exception as e:
+            stats.record_error(e)
+            chat_history.pop()
+
+
+def db_snapshot(db_manager: DatabaseManager) -> Dict:
+    shards = db_manager.get_storage_stats()
+    return {
+        "bytes": sum(shard["size_bytes"] for shard in shards),
+        "interactions": sum(shard["interactions"] for shard in shards),
+        "sessions": sum(shard["sessions"] for shard in shards)
+    }
+
+
+def format_report(label: str, elapsed: float, turns: List[float], reads: List[float],
+                  stats: LoadStats, snapshot: Dict, baseline: Dict) -> str:
+    with stats.lock:
+        errors = dict(stats.errors)
+        total_turns = stats.turns
+        degraded = stats.degraded
+    growth_mb = (snapshot["bytes"] - baseline["bytes"]) / (1024 * 1024)
+    return (
+        f"[{label} t={elapsed:7.1f}s] "
+        f"turns={len(turns)} ({len(turns) / max(elapsed, 1e-9):.1f}/s, total {total_turns}) "
+        f"turn p50={percentile(turns, 50) * 1000:.0f}ms p99={percentile(turns, 99) * 1000:.0f}ms "
+        f"reads p50={percentile(reads, 50) * 1000:.1f}ms p99={percentile(reads, 99) * 1000:.1f}ms "
+        f"degraded={degraded} errors={errors or 0} "
+        f"db={snapshot['bytes'] / (1024 * 1024):.1f}MB (+{growth_mb:.1f}MB) "
+        f"rows={snapshot['interactions']}"
+    )
+
+
+def run(args) -> int:
+    db_path = args.db_path or os.path.join(tempfile.mkdtemp(prefix="linkedin_load_"), "load.db")
+    Config.DB_PATH = db_path
+    if args.no_cache:
+        Config.QUERY_CACHE_SIZE = 0
+    if args.shards:
+        Config.DB_SHARD_COUNT = args.shards
+    if args.deadline is not None:
+        Config.TURN_DEADLINE_SECONDS = args.deadline
+
+    if args.cassette:
+        # Drive the real agent graph, serving LLM calls from the recorded cassette
+        import services.agents as agents_module
+        agents_module.client = CassetteClient(
+            None, CassetteStore(args.cassette), "replay",
+            args.replay_latency_scale, args.cassette_miss_policy
+        )
+    else:
+        agent_service_module.compiled_graph = StubGraph(args.llm_latency_ms, args.llm_jitter, args.response_chars)
+    db_manager = DatabaseManager()
+    agent_service = AgentService(db_manager)
+    stats = LoadStats()
+
+    print(f"Database: {db_path} ({Config.DB_SHARD_COUNT} shard(s))")
+    llm = f"cassette {args.cassette}" if args.cassette else f"stub LLM latency {args.llm_latency_ms}ms"
+    print(f"Users: {args.users}, duration: {args.duration}s, think time: {args.think_time}s, {llm}")
+
+    baseline = db_snapshot(db_manager)
+    started = time.time()
+    stop_at = started + args.duration
+    threads = [
+        threading.Thread(
+            target=simulate_user,
+            args=(i, db_manager, agent_service, stats, stop_at, args.think_time, args.profile_update_rate),
+            daemon=True
+        )
+        for i in range(args.users)
+    ]
+    for thread in threads:
+        thread.start()
+        if args.ramp_up > 0:
+            time.sleep(args.ramp_up / args.users)
+
+    all_turns: List[float] = []
+    all_reads: List[float] = []
+    last_report = started
+    while any(thread.is_alive() for thread in threads):
+        time.sleep(0.5)
+        now = time.time()
+        if args.report_interval and now - last_report >= args.report_interval:
+            turns, reads = stats.drain()
+            all_turns.extend(turns)
+            all_reads.extend(reads)
+            print(format_report("interval", now - last_report, turns, reads, stats,
+                                db_snapshot(db_manager), baseline))
+            last_report = now
+
+    turns, reads = stats.drain()
+    all_turns.extend(turns)
+    all_reads.extend(reads)
+    elapsed = time.time() - started
+    print(format_report("total", elapsed, all_turns, all_reads, stats, db_snapshot(db_manager), baseline))
+    if all_turns:
+        print(f"turn mean={statistics.mean(all_turns) * 1000:.0f}ms "
+              f"max={max(all_turns) * 1000:.0f}ms")
+    print(f"query cache: {db_manager.cache_stats()}")
+    if agent_service.question_cache is not None:
+        print(f"question cache: {agent_service.question_cache.stats()}")
+    return 1 if stats.errors else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline concurrent-user load/soak test")
+    parser.add_argument("--users", type=int, default=20, help="Number of concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=30, help="Test duration in seconds")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Mean user think time in seconds")
+    parser.add_argument("--ramp-up", type=float, default=0, help="Seconds over which users are started")
+    parser.add_argument("--llm-latency-ms", type=float, default=800, help="Mean stub LLM latency")
+    parser.add_argument("--llm-jitter", type=float, default=0.3, help="Stub latency std-dev as a fraction of the mean")
+    parser.add_argument("--response-chars", type=int, default=1500, help="Size of each stub response")
+    parser.add_argument("--profile-update-rate", type=float, default=0.05,
+                        help="Probability that a turn also rewrites the profile")
+    parser.add_argument("--report-interval", type=float, default=10, help="Seconds between interval reports (0 disables)")
+    parser.add_argument("--cassette", help="Replay this LLM cassette through the real agent graph")
+    parser.add_argument("--replay-latency-scale", type=float, default=1.0,
+                        help="Multiplier on recorded latency when replaying (0 = full speed)")
+    parser.add_argument("--cassette-miss-policy", default="stub",
+                        help="What to do with unrecorded requests: error, stub")
+    parser.add_argument("--db-path", help="Database file to use (defaults to a fresh temp file)")
+    parser.add_argument("--shards", type=int, help="Spread user data over this many SQLite files")
+    parser.add_argument("--deadline", type=float,
+                        help=f"Per-turn deadline in seconds, 0 disables (default: {Config.TURN_DEADLINE_SECONDS})")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the DatabaseManager query cache")
+    sys.exit(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
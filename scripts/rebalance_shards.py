@@ -0,0 +1,177 @@
+"""Migrate user data between shard layouts.
+
+Reads every user-keyed row from the current layout (by default the single
+DB_PATH file) and copies it to the shard that owns its user_id in the target
+layout. Rows of tables with a natural primary key are copied with INSERT OR
+REPLACE. Rows of AUTOINCREMENT tables get a fresh id from the target and are
+skipped when a row with the same natural key is already there, so merging
+several shards into one never overwrites rows and the tool can be rerun
+safely. --purge deletes moved rows from their old file afterwards, but only
+for tables whose rows were all found in the target.
+
+    python -m scripts.rebalance_shards --to-shards 8
+    python -m scripts.rebalance_shards --from-shards 8 --to-shards 16 --purge
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import Config
+from database.memory import DatabaseManager
+from database.sharding import ShardRouter
+
+# Tables holding per-user rows, all keyed by a user_id column
+USER_TABLES = ["user_profiles", "user_interactions", "user_sessions", "profile_prefetch", "profile_versions",
+               "usage_overhead"]
+
+# Tables without a natural primary key (AUTOINCREMENT or rowid only): any
+# surrogate id is left to the target and rows are deduplicated on these columns
+NATURAL_KEYS = {
+    "user_interactions": ("user_id", "session_id", "timestamp", "query", "response"),
+    "usage_overhead": ("user_id", "timestamp", "model", "prompt_tokens", "completion_tokens"),
+}
+SURROGATE_KEY = "id"
+
+BATCH_SIZE = 1000
+
+
+def table_columns(conn: sqlite3.Connection, table: str):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def insert_sql(table: str, columns) -> str:
+    placeholders = ", ".join("?" for _ in columns)
+    natural_key = NATURAL_KEYS.get(table)
+    if not natural_key:
+        return f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    # IS compares NULLs as equal; the user_id/timestamp index serves the lookup
+    match = " AND ".join(f"{column} IS ?" for column in natural_key)
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) SELECT {placeholders} "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {match})"
+    )
+
+
+def insert_params(table: str, columns, row) -> tuple:
+    natural_key = NATURAL_KEYS.get(table)
+    if not natural_key:
+        return row
+    return tuple(row) + tuple(row[columns.index(column)] for column in natural_key)
+
+
+def user_counts(conn: sqlite3.Connection, table: str, user_ids) -> dict:
+    """Rows per user, counting rows with the same natural key once"""
+    natural_key = NATURAL_KEYS.get(table)
+    counted = f"DISTINCT {', '.join(natural_key)}" if natural_key else "*"
+    counts = {}
+    for user_id in user_ids:
+        counts[user_id] = conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT {counted} FROM {table} WHERE user_id = ?)", (user_id,)
+        ).fetchone()[0]
+    return counts
+
+
+def migrate_file(source_path: str, target: ShardRouter, target_conns, purge: bool) -> dict:
+    """Copy rows from one source file to their target shards.
+
+    Returns {table: rows copied}; tables whose copy could not be verified
+    are listed under "unverified" and are never purged.
+    """
+    moved = {"unverified": []}
+    source = sqlite3.connect(source_path)
+    try:
+        for table in USER_TABLES:
+            columns = table_columns(source, table)
+            if not columns:
+                continue
+            if table in NATURAL_KEYS:
+                columns = [column for column in columns if column != SURROGATE_KEY]
+            user_index = columns.index("user_id")
+            sql = insert_sql(table, columns)
+
+            pending = {}
+            moved_users = set()
+            count = 0
+            cursor = source.execute(f"SELECT {', '.join(columns)} FROM {table}")
+            while True:
+                rows = cursor.fetchmany(BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    user_id = row[user_index]
+                    target_path = target.path_for(user_id or "")
+                    if os.path.abspath(target_path) == os.path.abspath(source_path):
+                        continue
+                    pending.setdefault(target_path, []).append(insert_params(table, columns, row))
+                    moved_users.add(user_id)
+                for target_path, batch in pending.items():
+                    changes_before = target_conns[target_path].total_changes
+                    target_conns[target_path].executemany(sql, batch)
+                    count += target_conns[target_path].total_changes - changes_before
+                pending.clear()
+
+            for conn in target_conns.values():
+                conn.commit()
+
+            # Every moved user must have at least as many rows in the target as in the source
+            source_counts = user_counts(source, table, moved_users)
+            short = [
+                user_id for user_id, expected in source_counts.items()
+                if user_counts(target_conns[target.path_for(user_id or "")], table, [user_id])[user_id] < expected
+            ]
+            if short:
+                moved["unverified"].append(table)
+                print(f"⚠️ {source_path}: {table} is missing rows for {len(short)} user(s) in the target; not purged")
+            elif purge and moved_users:
+                source.executemany(f"DELETE FROM {table} WHERE user_id = ?", [(u,) for u in moved_users])
+                source.commit()
+            moved[table] = count
+    finally:
+        source.close()
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebalance user data across SQLite shards")
+    parser.add_argument("--from-shards", type=int, default=1, help="Current shard count (default: 1, the single DB_PATH file)")
+    parser.add_argument("--to-shards", type=int, required=True, help="Target shard count")
+    parser.add_argument("--db-path", default=Config.DB_PATH, help=f"Base database path (default: {Config.DB_PATH})")
+    parser.add_argument("--purge", action="store_true", help="Delete moved rows from their old file")
+    args = parser.parse_args()
+
+    Config.DB_PATH = args.db_path
+    source = ShardRouter(args.db_path, args.from_shards)
+    target = ShardRouter(args.db_path, args.to_shards)
+
+    # Create the target shard files with the current schema
+    Config.DB_SHARD_COUNT = args.to_shards
+    DatabaseManager()
+
+    started = time.time()
+    target_conns = {path: sqlite3.connect(path) for path in target.shard_paths}
+    unverified = []
+    try:
+        for source_path in source.shard_paths:
+            if not os.path.exists(source_path):
+                continue
+            moved = migrate_file(source_path, target, target_conns, args.purge)
+            unverified += moved.pop("unverified")
+            print(f"{source_path}: " + ", ".join(f"{table}={count}" for table, count in moved.items()))
+    finally:
+        for conn in target_conns.values():
+            conn.close()
+
+    print(f"Rebalanced {args.from_shards} -> {args.to_shards} shards in {time.time() - started:.1f}s")
+    if not args.purge:
+        print("Source rows were kept; rerun with --purge once the new layout is in use.")
+    if unverified:
+        print(f"Copy could not be verified for: {', '.join(sorted(set(unverified)))}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Rebuild the cohort aggregates from every stored profile.
+
+Profile saves keep the aggregates current through
+DatabaseManager.update_cohort_stats; this fills them for profiles stored
+before that, or after the bucketing rules change. The tables are emptied and
+every profile is added back shard by shard, so the tool can be rerun safely.
+
+    python -m scripts.rebuild_cohort_stats
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import Config
+from database.memory import DatabaseManager
+
+BATCH_SIZE = 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild cohort statistics from stored profiles")
+    parser.add_argument("--db-path", help=f"Database file (default: {Config.DB_PATH})")
+    args = parser.parse_args()
+
+    if args.db_path:
+        Config.DB_PATH = args.db_path
+    db_manager = DatabaseManager()
+
+    started = time.time()
+    db_manager.reset_cohort_stats()
+    added = 0
+    for conn in db_manager.iter_shard_connections():
+        cursor = conn.execute("SELECT user_id, profile_data FROM user_profiles WHERE profile_data IS NOT NULL")
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            for user_id, profile_data in rows:
+                added += db_manager.update_cohort_stats(user_id, json.loads(profile_data))
+
+    print(f"Added {added} profiles to cohort statistics in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,138 @@
 import json
+import re
+import time
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from langchain_core.messages import HumanMessage, AIMessage
 from config.settings import Config
+from services.cohort_stats import format_cohort_percentiles
+from services.fallback import build_degraded_response
+from services.job_matching import format_job_matches, get_job_matcher
+from services.jobs import get_job_runner
+from services.profile_context import get_profile_context_cache
+from services.question_cache import get_question_cache
+from utils.helpers import profile_hash
+from utils.profile_diff import changed_values, describe_diff, diff_profiles
 import streamlit as st
 
 # Trying to import agents, mock if unavailable
 try:
-    from services.agents import compiled_graph
+    from services.agents import DeadlineExceeded, compiled_graph, get_model_metrics
 except ImportError:
+    class DeadlineExceeded(Exception):
+        """Raised when an LLM call cannot finish before the turn deadline"""
+    
+    def get_model_metrics() -> Dict[str, Dict]:
+        return {}
+    
     class MockCompiledGraph:
-        def invoke(self, input_data):
+        def invoke(self, input_data, config=None):
             return {"messages": [AIMessage(content="I'm here to help optimize your LinkedIn profile! Ask me about profile improvements, career advice, or content writing.")]}
     
     compiled_graph = MockCompiledGraph()
 
+class QuotaExceededError(Exception):
+    """Raised when a user has used up their daily token budget"""
+
+# Context for generic questions; deliberately free of profile data so the
+# answer can be shared with every user who asks the same thing
+GENERIC_CONTEXT = """
+        You are LearnTube's AI Career Coach. Answer this general LinkedIn question with
+        practical advice and short examples that apply to any professional. Do not assume
+        anything about the person asking; they can share their profile for tailored advice.
+        """
+
+# Context for re-reviewing a profile after a small edit: the previous review
+# plus only the changed fields, instead of the whole profile
+INCREMENTAL_ANALYSIS_CONTEXT = """
+        You are LearnTube's AI Career Coach. You previously reviewed this user's LinkedIn
+        profile. They have since edited it. Update your review for the changes below: revise
+        the recommendations for the changed sections and keep the rest of the review as is.
+        
+        PREVIOUS REVIEW:
+        {previous_review}
+        
+        CHANGES: {changes}
+        
+        UPDATED FIELDS (list sections show only added or edited entries):
+        {changed_fields}
+        """
+
 class AgentService:
     """Handles agent routing and communication"""
     
     def __init__(self, db_manager):
         self.db_manager = db_manager
+        self.question_cache = get_question_cache(db_manager) if Config.QUESTION_CACHE_ENABLED else None
+        self.profile_context = get_profile_context_cache(db_manager)
     
-    def determine_agent(self, user_message: str) -> Dict[str, str]:
+    def determine_agent(self, user_message: str, chat_history: Optional[List] = None) -> Dict[str, str]:
         """Determine which agent should handle the message"""
         message_lower = user_message.lower()
         
         if any(word in message_lower for word in ["optimize", "improve", "profile", "completeness", "gaps"]):
-            return {
+            agent_info = {
                 "id": "profile_analyzer", 
                 "name": "Profile Optimizer", 
                 "emoji": "📊", 
                 "display": "📊 Profile Optimizer"
             }
         elif any(word in message_lower for word in ["job", "fit", "role", "career", "match", "alignment"]):
-            return {
+            agent_info = {
                 "id": "job_fit_analyzer", 
                 "name": "Career Advisor", 
                 "emoji": "🎯", 
                 "display": "🎯 Career Advisor"
             }
         elif any(word in message_lower for word in ["content", "headline", "summary", "writing", "enhance"]):
-            return {
+            agent_info = {
                 "id": "content_enhancer", 
                 "name": "Content Writer", 
                 "emoji": "✍️", 
                 "display": "✍️ Content Writer"
             }
         else:
-            return {
+            agent_info = {
                 "id": "profile_analyzer", 
                 "name": "Profile Optimizer", 
                 "emoji": "📊", 
                 "display": "📊 Profile Optimizer"
             }
+        
+        agent_info["profile_independent"] = self.is_profile_independent(user_message, chat_history)
+        return agent_info
+    
+    def is_profile_independent(self, user_message: str, chat_history: Optional[List] = None) -> bool:
+        """Check whether a message is a generic question whose answer depends on
+        neither the profile nor the earlier conversation"""
+        message_lower = " ".join(user_message.lower().split())
+        if len(message_lower) > Config.QUESTION_CACHE_MAX_QUESTION_CHARS:
+            return False
+        if not message_lower.startswith(tuple(Config.GENERIC_QUESTION_PREFIXES)):
+            return False
+        if any(marker in message_lower for marker in Config.PERSONAL_QUESTION_MARKERS):
+            return False
+        words = re.findall(r"[a-z']+", message_lower)
+        if any(word in Config.PERSONAL_QUESTION_WORDS or word in Config.CONTEXT_DEPENDENT_WORDS for word in words):
+            return False
+        if self._has_prior_turns(user_message, chat_history) and (
+            len(words) <= Config.FOLLOW_UP_MAX_WORDS
+            or re.match(r"(?:%s)\b" % "|".join(map(re.escape, Config.FOLLOW_UP_PREFIXES)), message_lower)
+        ):
+            return False
+        return True
+    
+    @staticmethod
+    def _has_prior_turns(user_message: str, chat_history: Optional[List]) -> bool:
+        """Whether the history holds anything besides the message being answered"""
+        history = list(chat_history or [])
+        if history and history[-1].get("role") == "user" and history[-1].get("content") == user_message:
+            history.pop()
+        return bool(history)
     
     def build_system_context(self, user_id: str, profile_data: Dict, 
-                           career_goals: List, user_preferences: Dict) -> str:
+                           career_goals: List, user_preferences: Dict,
+                           extra_sections: Optional[Dict[str, str]] = None) -> str:
         """Build system context for agents with memory"""
         interaction_history = self.db_manager.get_user_interaction_history(user_id, 20, 7)  # Last 20 interactions from past 7 days
         
@@ -65,6 +142,12 @@ class AgentService:
             for interaction in interaction_history[:5]:  # Last 5 interactions
                 recent_topics.append(f"User asked: {interaction['message'][:100]}...")
         
+        # Additional titled sections, e.g. local job matches
+        extra_context = "".join(
+            f"{title}:\n        {body}\n        \n        "
+            for title, body in (extra_sections or {}).items()
+        )
+        
         context = f"""
         You are LearnTube's AI Career Coach with access to the user's LinkedIn profile and conversation history.
         
@@ -83,8 +166,8 @@ class AgentService:
         - User has been active over multiple sessions
         - Maintain continuity with previous conversations
         
-        PROFILE DATA:
-        {json.dumps(profile_data, indent=2) if profile_data else 'No profile data available'}
+        {extra_context}PROFILE DATA:
+        {self.profile_context.render_profile(user_id, profile_data) if profile_data else 'No profile data available'}
         
         Provide personalized, actionable advice. Reference previous conversations when relevant to show continuity.
         """
@@ -93,72 +176,260 @@ class AgentService:
     
     def process_message(self, user_message: str, chat_history: List, 
                        user_id: str, profile_data: Dict, 
-                       career_goals: List, user_preferences: Dict) -> tuple:
-        """Process user message and get agent response with memory persistence"""
+                       career_goals: List, user_preferences: Dict,
+                       session_id: Optional[str] = None,
+                       deadline_seconds: Optional[float] = None) -> tuple:
+        """Process user message and get agent response with memory persistence.
+        
+        If the agents cannot answer within deadline_seconds (default
+        Config.TURN_DEADLINE_SECONDS) a degraded local answer is returned instead.
+        """
+        # Callers outside the Streamlit script thread must pass session_id explicitly
+        session_id = session_id or st.session_state.get('session_id')
+        if deadline_seconds is None:
+            deadline_seconds = Config.TURN_DEADLINE_SECONDS
+        deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
         try:
             # Determine agent
-            agent_info = self.determine_agent(user_message)
+            agent_info = self.determine_agent(user_message, chat_history)
             
-            # Build context with memory
-            system_context = self.build_system_context(
-                user_id, profile_data, career_goals, user_preferences
-            )
+            # Serve a speculatively generated review if one is waiting for this profile
+            prefetched_result = self._take_prefetched_response(user_id, user_message, agent_info, profile_data)
+            prefetched = prefetched_result is not None
+            degraded = False
             
-            messages = [AIMessage(content=system_context)]
+            # Generic questions are answered from, and added to, the shared cache
+            # Messages without content words cannot be matched, so they keep their context
+            shared = (self.question_cache is not None and agent_info.get("profile_independent", False)
+                      and self.question_cache.cacheable(user_message))
+            cached_result = None
+            if shared and not prefetched:
+                cached_result = self.question_cache.lookup(user_message, agent_info["id"])
             
-            for msg in chat_history[-10:]:  # Last 10 messages to maintain context
-                if msg["role"] == "user":
-                    messages.append(HumanMessage(content=msg["content"]))
+            if prefetched:
+                assistant_message, usage = prefetched_result
+            elif cached_result:
+                assistant_message, usage = cached_result["response"], {}
+            else:
+                self.check_quota(user_id)
+                
+                if shared:
+                    messages = [AIMessage(content=GENERIC_CONTEXT), HumanMessage(content=user_message)]
                 else:
-                    messages.append(AIMessage(content=msg["content"]))
+                    messages = self._build_messages(
+                        user_id, user_message, chat_history, profile_data, career_goals, user_preferences,
+                        self._extra_context_sections(user_id, agent_info, profile_data)
+                    )
+                
+                # Get response from agents
+                try:
+                    assistant_message, usage = self._invoke_agents(messages, deadline, user_id)
+                except DeadlineExceeded:
+                    assistant_message, usage = build_degraded_response(
+                        self.db_manager, user_id, user_message, agent_info, profile_data,
+                        allow_prefetched=not shared and self.is_prefetch_question(user_message, agent_info)
+                    )
+                    degraded = True
+                
+                if shared and not degraded:
+                    self.question_cache.store(user_message, agent_info["id"], assistant_message, usage)
             
-            messages.append(HumanMessage(content=user_message))
+            # Prepare context data for storage
+            context_data = {
+                "agent_id": agent_info["id"],
+                "career_goals": career_goals,
+                "user_preferences": user_preferences,
+                "profile_available": bool(profile_data),
+                "prefetched": prefetched,
+                "degraded": degraded,
+                "question_cache": ("hit" if cached_result else "miss") if shared and not prefetched else None
+            }
             
-            # Get response from agents
-            result = compiled_graph.invoke({"messages": messages})
+            # Save interaction with session and context
+            self.db_manager.save_interaction(
+                user_id, 
+                user_message, 
+                assistant_message, 
+                agent_info["id"],
+                session_id,
+                context_data,
+                usage
+            )
             
-            if result and "messages" in result and result["messages"]:
-                assistant_message = result["messages"][-1].content
-                
-                # Prepare context data for storage
-                context_data = {
-                    "agent_id": agent_info["id"],
-                    "career_goals": career_goals,
-                    "user_preferences": user_preferences,
-                    "profile_available": bool(profile_data)
-                }
-                
-                # Save interaction with session and context
-                self.db_manager.save_interaction(
-                    user_id, 
-                    user_message, 
-                    assistant_message, 
-                    agent_info["id"],
-                    st.session_state.get('session_id'),
-                    context_data
-                )
-                
-                # Save session data periodically
-                self._save_session_state(user_id)
-                
-                return assistant_message, agent_info
-            else:
-                raise Exception("No response received from agents")
-                
+            # Save session data periodically
+            self._save_session_state(user_id, session_id, chat_history, profile_data, career_goals)
+            
+            return assistant_message, agent_info
+        
+        except QuotaExceededError:
+            raise
         except Exception as e:
             raise Exception(f"Error processing message: {str(e)}")
     
-    def _save_session_state(self, user_id: str):
+    def _extra_context_sections(self, user_id: str, agent_info: Dict, profile_data: Dict) -> Dict[str, str]:
+        """Collect agent-specific context sections computed locally"""
+        sections = {}
+        if agent_info["id"] == "job_fit_analyzer" and profile_data:
+            matcher = get_job_matcher()
+            matches = self.profile_context.job_matches(
+                user_id, profile_data, lambda: matcher.match(profile_data, Config.JOB_MATCH_TOP_K)
+            ) if matcher else []
+            if matches:
+                sections["TOP MATCHING ROLES FROM JOB CORPUS"] = format_job_matches(matches)
+        if agent_info["id"] in ("profile_analyzer", "job_fit_analyzer") and profile_data and Config.COHORT_STATS_ENABLED:
+            cohort = self.db_manager.get_cohort_percentiles(profile_data)
+            if cohort:
+                sections["PEER BENCHMARK"] = format_cohort_percentiles(cohort)
+        return sections
+    
+    def _build_messages(self, user_id: str, user_message: str, chat_history: List,
+                        profile_data: Dict, career_goals: List, user_preferences: Dict,
+                        extra_sections: Optional[Dict[str, str]] = None) -> List:
+        """Build the message list sent to the agent graph"""
+        # Build context with memory
+        system_context = self.build_system_context(
+            user_id, profile_data, career_goals, user_preferences, extra_sections
+        )
+        
+        messages = [AIMessage(content=system_context)]
+        
+        for msg in chat_history[-10:]:  # Last 10 messages to maintain context
+            if msg["role"] == "user":
+                messages.append(HumanMessage(content=msg["content"]))
+            else:
+                messages.append(AIMessage(content=msg["content"]))
+        
+        messages.append(HumanMessage(content=user_message))
+        return messages
+    
+    def _invoke_agents(self, messages: List, deadline: Optional[float] = None,
+                       user_id: Optional[str] = None) -> Tuple[str, Dict]:
+        """Run the agent graph and return the final assistant message and its token usage.
+        
+        deadline is an absolute time.monotonic() value; DeadlineExceeded is raised past it.
+        Tokens of requests whose answer goes unused (hedge losers, calls past the
+        deadline) are charged to user_id once they finish.
+        """
+        configurable = {"deadline": deadline}
+        if user_id:
+            configurable["on_extra_usage"] = lambda usage: self.db_manager.record_extra_usage(user_id, usage)
+        result = compiled_graph.invoke({"messages": messages}, config={"configurable": configurable})
+        
+        if result and "messages" in result and result["messages"]:
+            final_message = result["messages"][-1]
+            return final_message.content, dict(getattr(final_message, "response_metadata", None) or {})
+        raise Exception("No response received from agents")
+    
+    def is_prefetch_question(self, user_message: str, agent_info: Dict) -> bool:
+        """Check whether a message asks for the generic initial profile review"""
+        if agent_info["id"] != "profile_analyzer":
+            return False
+        message_lower = user_message.lower().strip()
+        if len(message_lower) > Config.PREFETCH_MAX_QUESTION_CHARS:
+            return False
+        words = set(re.findall(r"[a-z]+", message_lower))
+        return (
+            "profile" in words
+            and bool(words & set(Config.PREFETCH_ACTION_WORDS))
+            and words <= set(Config.PREFETCH_QUESTION_WORDS)
+        )
+    
+    def _take_prefetched_response(self, user_id: str, user_message: str,
+                                  agent_info: Dict, profile_data: Dict) -> Optional[Tuple[str, Dict]]:
+        """Return and consume the prefetched review for this exact profile, if any"""
+        if not Config.PREFETCH_ENABLED or not profile_data:
+            return None
+        if not self.is_prefetch_question(user_message, agent_info):
+            return None
+        return self.db_manager.take_prefetched_response(user_id, profile_hash(profile_data))
+    
+    def start_profile_prefetch(self, user_id: str, profile_data: Dict) -> None:
+        """Generate the profile analyzer's initial review in the background"""
+        if not Config.PREFETCH_ENABLED or not profile_data:
+            return
+        get_job_runner().submit(
+            f"prefetch:{user_id}:{profile_hash(profile_data)}",
+            self._prefetch_profile_analysis, user_id, profile_data
+        )
+    
+    def _prefetch_profile_analysis(self, user_id: str, profile_data: Dict) -> None:
+        digest = profile_hash(profile_data)
+        if self.db_manager.has_prefetched_response(user_id, digest):
+            return
+        try:
+            previous = self.db_manager.get_latest_profile_analysis(user_id)
+            if previous and previous["profile_hash"] == digest:
+                # Reverted to a version that was already reviewed
+                self.db_manager.save_prefetched_response(user_id, digest, "profile_analyzer", previous["analysis"], {})
+                return
+            messages = self._build_analysis_messages(user_id, profile_data, previous)
+            remaining = self.get_remaining_tokens(user_id)
+            if remaining is not None and remaining < self._estimate_tokens(messages):
+                return
+            response, usage = self._invoke_agents(messages, user_id=user_id)
+            # Charged now: a later save replaces the review, which may never be shown
+            if usage:
+                self.db_manager.record_extra_usage(user_id, usage)
+            self.db_manager.save_prefetched_response(
+                user_id, digest, "profile_analyzer", response,
+                {**usage, "prompt_tokens": 0, "completion_tokens": 0}
+            )
+        except Exception as e:
+            # Speculative work; the user simply pays the normal round trip
+            print(f"⚠️ Profile prefetch failed for {user_id}: {e}")
+    
+    def _estimate_tokens(self, messages: List) -> int:
+        """Upper estimate of a profile analyzer call: the prompt plus the largest completion"""
+        prompt_chars = sum(len(message.content) for message in messages)
+        max_completion = max(
+            Config.MODEL_TIERS[tier]["max_completion_tokens"]
+            for tier in Config.AGENT_MODEL_POLICY["profile_analyzer"].values()
+        )
+        return prompt_chars // Config.PREFETCH_CHARS_PER_TOKEN + max_completion
+    
+    def _build_analysis_messages(self, user_id: str, profile_data: Dict, previous: Optional[Dict]) -> List:
+        """Full review messages, or an incremental update of the previous review
+        when only a few sections changed since it was written"""
+        diff = diff_profiles(previous["profile_data"], profile_data) if previous else None
+        if not diff or not diff["changed_sections"] or len(diff["changed_sections"]) > Config.INCREMENTAL_ANALYSIS_MAX_SECTIONS:
+            return self._build_messages(user_id, Config.PREFETCH_QUESTION, [], profile_data, [], {})
+        
+        context = INCREMENTAL_ANALYSIS_CONTEXT.format(
+            previous_review=previous["analysis"],
+            changes=describe_diff(diff),
+            changed_fields=json.dumps(changed_values(previous["profile_data"], profile_data), indent=2)
+        )
+        return [AIMessage(content=context), HumanMessage(content=Config.PREFETCH_QUESTION)]
+    
+    def get_model_metrics(self) -> Dict[str, Dict]:
+        """Per-tier latency and token metrics, empty when the agents are mocked"""
+        return get_model_metrics()
+    
+    def get_remaining_tokens(self, user_id: str) -> Optional[int]:
+        """Get the user's remaining daily token budget, or None when unlimited"""
+        if not Config.DAILY_TOKEN_QUOTA:
+            return None
+        return max(0, Config.DAILY_TOKEN_QUOTA - self.db_manager.get_tokens_used_today(user_id))
+    
+    def check_quota(self, user_id: str) -> None:
+        """Raise QuotaExceededError if the user has no token budget left today"""
+        if self.get_remaining_tokens(user_id) == 0:
+            raise QuotaExceededError(
+                f"Daily token quota of {Config.DAILY_TOKEN_QUOTA} tokens reached. Please try again tomorrow."
+            )
+    
+    def _save_session_state(self, user_id: str, session_id: str, chat_history: List,
+                            profile_data: Dict, career_goals: List):
         """Save current session state to database"""
         session_data = {
-            "chat_history_length": len(st.session_state.get('chat_history', [])),
-            "profile_data_available": bool(st.session_state.get('profile_data')),
-            "career_goals_count": len(st.session_state.get('career_goals', [])),
+            "chat_history_length": len(chat_history),
+            "profile_data_available": bool(profile_data),
+            "career_goals_count": len(career_goals or []),
             "last_activity": datetime.now().isoformat()
         }
         
         self.db_manager.save_session_data(
-            st.session_state.get('session_id'),
+            session_id,
             user_id,
             session_data
         )
\ No newline at end of file
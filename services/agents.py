@@ -1,18 +1,242 @@
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
 from langgraph.graph import StateGraph, START, END, MessagesState
 from langgraph.types import Command
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
 from groq import Groq
 from dotenv import load_dotenv
 import streamlit as st
+from config.settings import Config
+from services.cassette import wrap_client
 
 load_dotenv()
 key = os.getenv("GROQ_API_KEY")
-if not key:
+# Replaying recorded cassettes works fully offline without a key
+if not key and Config.LLM_CASSETTE_MODE != "replay":
     st.error("GROQ_API_KEY missing")
     st.stop()
-client = Groq(api_key=key)
+client = wrap_client(Groq(api_key=key) if key else None, Config)
 
-def call_groq(messages):
+# Runs primary and hedged requests so call_groq can stop waiting at the deadline
+_request_pool = ThreadPoolExecutor(max_workers=Config.HEDGE_POOL_SIZE, thread_name_prefix="groq-request")
+# Caps hedged requests running at once so sustained slowness cannot starve new calls
+_hedge_slots = threading.BoundedSemaphore(Config.HEDGE_MAX_IN_FLIGHT)
+
+class DeadlineExceeded(Exception):
+    """Raised when an LLM call cannot finish before the turn deadline"""
+
+class ModelMetrics:
+    """Per-tier latency and token counters for LLM calls"""
+    
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._window = window
+        self._tiers: Dict[str, Dict] = {}
+    
+    def _stats_for(self, tier: str, model: str) -> Dict:
+        return self._tiers.setdefault(tier, {
+            "model": model,
+            "calls": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "deadline_misses": 0,
+            "abandoned_prompt_tokens": 0,
+            "abandoned_completion_tokens": 0,
+            "latencies": deque(maxlen=self._window)
+        })
+    
+    def record(self, tier: str, model: str, latency: float, usage) -> None:
+        with self._lock:
+            stats = self._stats_for(tier, model)
+            stats["calls"] += 1
+            stats["latencies"].append(latency)
+            if usage is not None:
+                stats["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+                stats["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+    
+    def record_abandoned(self, tier: str, model: str, usage) -> None:
+        """Count tokens of a request whose answer was not used (hedge loser or past the deadline)"""
+        with self._lock:
+            stats = self._stats_for(tier, model)
+            stats["abandoned_prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            stats["abandoned_completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+    
+    def record_event(self, tier: str, model: str, event: str) -> None:
+        """Count a hedge, hedge win or deadline miss for a tier"""
+        with self._lock:
+            self._stats_for(tier, model)[event] += 1
+    
+    def latency_percentile(self, tier: str, pct: float, min_samples: int) -> Optional[float]:
+        """Latency percentile in seconds, or None until enough calls were seen"""
+        with self._lock:
+            stats = self._tiers.get(tier)
+            if not stats or len(stats["latencies"]) < min_samples:
+                return None
+            return _percentile(sorted(stats["latencies"]), pct)
+    
+    def snapshot(self) -> Dict[str, Dict]:
+        """Return per-tier call counts, token totals and latency percentiles"""
+        with self._lock:
+            result = {}
+            for tier, stats in self._tiers.items():
+                latencies = sorted(stats["latencies"])
+                result[tier] = {
+                    "model": stats["model"],
+                    "calls": stats["calls"],
+                    "prompt_tokens": stats["prompt_tokens"],
+                    "completion_tokens": stats["completion_tokens"],
+                    "hedged": stats["hedged"],
+                    "hedge_wins": stats["hedge_wins"],
+                    "deadline_misses": stats["deadline_misses"],
+                    "abandoned_tokens": stats["abandoned_prompt_tokens"] + stats["abandoned_completion_tokens"],
+                    "p50_latency_ms": _percentile(latencies, 50) * 1000,
+                    "p95_latency_ms": _percentile(latencies, 95) * 1000
+                }
+            return result
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+model_metrics = ModelMetrics()
+
+def classify_request(messages) -> str:
+    """Classify request complexity as simple, normal or complex"""
+    # Only user messages count as turns: assistant messages include the injected
+    # system context and the outputs of earlier agents in the graph
+    user_turns = [
+        msg.content if hasattr(msg, "content") else msg["content"]
+        for msg in messages
+        if (getattr(msg, "type", None) or (msg.get("role") if isinstance(msg, dict) else None)) in ("human", "user")
+    ]
+    last_user = user_turns[-1] if user_turns else ""
+    prior_turns = len(user_turns) - 1
+    
+    text = last_user.lower()
+    if (len(last_user) >= Config.MODEL_COMPLEX_MIN_PROMPT_CHARS
+            or any(keyword in text for keyword in Config.MODEL_COMPLEX_KEYWORDS)):
+        return "complex"
+    # A long conversation alone is not enough; short follow-ups stay on the cheaper tiers
+    if (prior_turns >= Config.MODEL_COMPLEX_MIN_PRIOR_TURNS
+            and len(last_user) > Config.MODEL_SIMPLE_MAX_PROMPT_CHARS):
+        return "complex"
+    if (len(last_user) <= Config.MODEL_SIMPLE_MAX_PROMPT_CHARS
+            and any(keyword in text for keyword in Config.MODEL_SIMPLE_KEYWORDS)):
+        return "simple"
+    return "normal"
+
+def select_model(agent: str, messages) -> Tuple[str, Dict]:
+    """Pick the model tier for an agent call based on request complexity"""
+    complexity = classify_request(messages)
+    policy = Config.AGENT_MODEL_POLICY.get(agent, {})
+    tier = policy.get(complexity, "standard")
+    return tier, Config.MODEL_TIERS[tier]
+
+def get_model_metrics() -> Dict[str, Dict]:
+    """Get per-tier latency and token metrics"""
+    return model_metrics.snapshot()
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else deadline - time.monotonic()
+
+def _track_abandoned(futures, tier: str, model: str,
+                     on_extra_usage: Optional[Callable[[Dict], None]]) -> None:
+    """Cancel requests that have not started; bill the others once they finish"""
+    def finished(future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        usage = getattr(future.result(), "usage", None)
+        if usage is None:
+            return
+        model_metrics.record_abandoned(tier, model, usage)
+        if on_extra_usage:
+            try:
+                on_extra_usage({
+                    "model": model,
+                    "tier": tier,
+                    "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                    "completion_tokens": getattr(usage, "completion_tokens", 0) or 0
+                })
+            except Exception as e:
+                print(f"⚠️ Could not record usage of an abandoned request: {e}")
+    
+    for future in futures:
+        if not future.cancel():
+            future.add_done_callback(finished)
+
+def _submit_hedge(request: Dict):
+    """Start a hedged copy if a slot is free, else None"""
+    if not _hedge_slots.acquire(blocking=False):
+        return None
+    future = _request_pool.submit(client.chat.completions.create, **request)
+    future.add_done_callback(lambda _: _hedge_slots.release())
+    return future
+
+def _create_completion(request: Dict, tier: str, deadline: Optional[float],
+                       on_extra_usage: Optional[Callable[[Dict], None]] = None):
+    """Send the request, hedging with a second copy if the first is slow.
+
+    The hedge fires after the tier's HEDGE_PERCENTILE latency; whichever copy
+    answers first wins. Raises DeadlineExceeded if nothing arrives in time.
+    Requests whose answer goes unused are still billed by the provider, so
+    their tokens are reported to on_extra_usage when they finish.
+    """
+    remaining = _remaining(deadline)
+    if remaining is None and not Config.HEDGE_ENABLED:
+        return client.chat.completions.create(**request)
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded("Turn deadline already passed")
+    if remaining is not None:
+        request = {**request, "timeout": remaining}
+    
+    futures = [_request_pool.submit(client.chat.completions.create, **request)]
+    hedge_delay = None
+    if Config.HEDGE_ENABLED:
+        hedge_delay = model_metrics.latency_percentile(tier, Config.HEDGE_PERCENTILE, Config.HEDGE_MIN_SAMPLES)
+        if hedge_delay is not None:
+            hedge_delay = max(hedge_delay, Config.HEDGE_MIN_DELAY_SECONDS)
+    
+    if hedge_delay is not None and (remaining is None or hedge_delay < remaining):
+        done, _ = wait(futures, timeout=hedge_delay)
+        if not done:
+            remaining = _remaining(deadline)
+            if remaining is not None:
+                request = {**request, "timeout": remaining}
+            hedge = _submit_hedge(request)
+            if hedge is not None:
+                model_metrics.record_event(tier, request["model"], "hedged")
+                futures.append(hedge)
+    
+    pending = set(futures)
+    last_error = None
+    while pending:
+        done, pending = wait(pending, timeout=_remaining(deadline), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            if future.exception() is None:
+                if future is not futures[0]:
+                    model_metrics.record_event(tier, request["model"], "hedge_wins")
+                _track_abandoned([f for f in futures if f is not future], tier, request["model"], on_extra_usage)
+                return future.result()
+            last_error = future.exception()
+    
+    if pending:
+        model_metrics.record_event(tier, request["model"], "deadline_misses")
+        _track_abandoned(pending, tier, request["model"], on_extra_usage)
+        raise DeadlineExceeded("LLM did not respond before the turn deadline")
+    raise last_error
+
+def call_groq(messages, agent: str = "profile_analyzer", deadline: Optional[float] = None,
+              on_extra_usage: Optional[Callable[[Dict], None]] = None):
     formatted_messages = []
     for i, msg in enumerate(messages):
         if hasattr(msg, 'content') and hasattr(msg, 'type'):
@@ -24,17 +248,30 @@ def call_groq(messages):
         else:
             print(f"❌ message[{i}] format not recognized: {msg}")
     
-    resp = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=formatted_messages,
-        temperature=1,
-        max_completion_tokens=1024,
-        top_p=1,
-        stream=False,
-    )
-    return resp.choices[0].message.content
-
-def profile_analyzer(state: MessagesState) -> Command:
+    tier, model_config = select_model(agent, messages)
+    start = time.perf_counter()
+    resp = _create_completion({
+        "model": model_config["model"],
+        "messages": formatted_messages,
+        "temperature": model_config["temperature"],
+        "max_completion_tokens": model_config["max_completion_tokens"],
+        "top_p": 1,
+        "stream": False,
+    }, tier, deadline, on_extra_usage)
+    latency = time.perf_counter() - start
+    usage = getattr(resp, "usage", None)
+    model_metrics.record(tier, model_config["model"], latency, usage)
+    
+    usage_info = {
+        "model": model_config["model"],
+        "tier": tier,
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "latency_ms": latency * 1000
+    }
+    return resp.choices[0].message.content, usage_info
+
+def profile_analyzer(state: MessagesState, config: RunnableConfig) -> Command:
     system_prompt = """You are a LinkedIn profile optimization expert. Analyze the provided LinkedIn profile data and provide specific, actionable feedback for improvement. Focus on:
     
     1. **Profile Completeness**: Missing sections, incomplete information
@@ -45,10 +282,10 @@ def profile_analyzer(state: MessagesState) -> Command:
     
     Provide specific recommendations with examples where possible."""
     
-    content = call_groq(state["messages"] + [{"role": "system", "content": system_prompt}])
-    return Command(goto=END, update={"messages": [{"role": "assistant", "content": content}]})
+    content, usage_info = call_groq(state["messages"] + [{"role": "system", "content": system_prompt}], "profile_analyzer", _deadline(config), _extra_usage_sink(config))
+    return Command(goto=END, update={"messages": [AIMessage(content=content, response_metadata=usage_info)]})
 
-def job_fit_analyzer(state: MessagesState) -> Command:
+def job_fit_analyzer(state: MessagesState, config: RunnableConfig) -> Command:
     system_prompt = """You are a career advisor specializing in job-profile matching. Analyze the LinkedIn profile in context of job requirements. Focus on:
     
     1. **Skills Alignment**: Match between profile skills and job requirements
@@ -59,10 +296,10 @@ def job_fit_analyzer(state: MessagesState) -> Command:
     
     Provide a detailed analysis with improvement suggestions to better align with desired positions."""
     
-    content = call_groq(state["messages"] + [{"role": "system", "content": system_prompt}])
-    return Command(goto=END, update={"messages": [{"role": "assistant", "content": content}]})
+    content, usage_info = call_groq(state["messages"] + [{"role": "system", "content": system_prompt}], "job_fit_analyzer", _deadline(config), _extra_usage_sink(config))
+    return Command(goto=END, update={"messages": [AIMessage(content=content, response_metadata=usage_info)]})
 
-def content_enhancer(state: MessagesState) -> Command:
+def content_enhancer(state: MessagesState, config: RunnableConfig) -> Command:
     system_prompt = """You are a professional content writer specializing in LinkedIn optimization. Help enhance profile content for maximum impact. Focus on:
     
     1. **Headline Optimization**: Compelling, keyword-rich headlines
@@ -73,8 +310,16 @@ def content_enhancer(state: MessagesState) -> Command:
     
     Provide specific content suggestions, rewrites, and examples that will increase profile visibility and engagement."""
     
-    content = call_groq(state["messages"] + [{"role": "system", "content": system_prompt}])
-    return Command(goto=END, update={"messages": [{"role": "assistant", "content": content}]})
+    content, usage_info = call_groq(state["messages"] + [{"role": "system", "content": system_prompt}], "content_enhancer", _deadline(config), _extra_usage_sink(config))
+    return Command(goto=END, update={"messages": [AIMessage(content=content, response_metadata=usage_info)]})
+
+def _deadline(config: Optional[RunnableConfig]) -> Optional[float]:
+    """Absolute time.monotonic() deadline passed via the graph config"""
+    return ((config or {}).get("configurable") or {}).get("deadline")
+
+def _extra_usage_sink(config: Optional[RunnableConfig]) -> Optional[Callable[[Dict], None]]:
+    """Callback for tokens of abandoned requests, passed via the graph config"""
+    return ((config or {}).get("configurable") or {}).get("on_extra_usage")
 
 def supervisor(state: MessagesState) -> Command:
     # look at last user message for keywords
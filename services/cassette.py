@@ -0,0 +1,175 @@
+"""Record/replay layer around the Groq client.
+
+In record mode every chat completion is forwarded to Groq and stored in a
+cassette database keyed by a fingerprint of the request. In replay mode
+responses are served from the cassette, optionally sleeping for the recorded
+latency, so production traffic shapes can be rerun offline.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, Optional
+
+# Request parameters that change the response; transport options like timeout are ignored
+FINGERPRINT_FIELDS = ("model", "messages", "temperature", "max_completion_tokens", "top_p")
+
+UNKNOWN_POLICIES = ("error", "passthrough", "record", "stub")
+
+class CassetteMissError(Exception):
+    """Raised in replay mode when a request has no recorded response"""
+
+def request_fingerprint(request: Dict) -> str:
+    """Stable hash of the parts of a completion request that affect the response"""
+    canonical = json.dumps(
+        {field: request.get(field) for field in FINGERPRINT_FIELDS},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class CassetteStore:
+    """SQLite-backed store of recorded completions, compressed with zlib"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS cassettes (
+                fingerprint TEXT PRIMARY KEY,
+                model TEXT,
+                request BLOB,
+                response BLOB,
+                latency_ms REAL,
+                recorded_at TIMESTAMP
+            );
+        ''')
+        self._conn.commit()
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute('''
+                SELECT response, latency_ms FROM cassettes WHERE fingerprint = ?
+            ''', (fingerprint,)).fetchone()
+        if row is None:
+            return None
+        entry = json.loads(zlib.decompress(row[0]))
+        entry["latency_ms"] = row[1]
+        return entry
+
+    def put(self, fingerprint: str, request: Dict, response: Dict, latency_ms: float) -> None:
+        request_blob = zlib.compress(json.dumps(
+            {field: request.get(field) for field in FINGERPRINT_FIELDS}, ensure_ascii=False
+        ).encode("utf-8"))
+        response_blob = zlib.compress(json.dumps(response, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self._conn.execute('''
+                INSERT OR REPLACE INTO cassettes
+                (fingerprint, model, request, response, latency_ms, recorded_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (fingerprint, request.get("model"), request_blob, response_blob,
+                  latency_ms, datetime.now().isoformat()))
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cassettes").fetchone()[0]
+
+def _to_response(entry: Dict) -> SimpleNamespace:
+    """Build an object shaped like a Groq chat completion from a stored entry"""
+    usage = entry.get("usage") or {}
+    return SimpleNamespace(
+        model=entry.get("model"),
+        choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=entry["content"]))],
+        usage=SimpleNamespace(
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            total_tokens=usage.get("total_tokens", 0)
+        )
+    )
+
+def _from_response(resp) -> Dict:
+    usage = getattr(resp, "usage", None)
+    return {
+        "model": getattr(resp, "model", None),
+        "content": resp.choices[0].message.content,
+        "usage": {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "total_tokens": getattr(usage, "total_tokens", 0) or 0
+        }
+    }
+
+class _Completions:
+    def __init__(self, cassette_client: "CassetteClient"):
+        self._cassette_client = cassette_client
+
+    def create(self, **kwargs):
+        return self._cassette_client.create_completion(**kwargs)
+
+class CassetteClient:
+    """Drop-in wrapper for Groq exposing chat.completions.create"""
+
+    def __init__(self, client, store: CassetteStore, mode: str,
+                 latency_scale: float = 1.0, unknown_policy: str = "error",
+                 stub_response: str = "This is a placeholder response replayed offline."):
+        if unknown_policy not in UNKNOWN_POLICIES:
+            raise ValueError(f"Unknown cassette miss policy: {unknown_policy}")
+        self.client = client
+        self.store = store
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.unknown_policy = unknown_policy
+        self.stub_response = stub_response
+        self.chat = SimpleNamespace(completions=_Completions(self))
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+
+    def _call_live(self, kwargs: Dict, fingerprint: str, record: bool):
+        if self.client is None:
+            raise CassetteMissError("No live Groq client available (GROQ_API_KEY missing)")
+        start = time.perf_counter()
+        resp = self.client.chat.completions.create(**kwargs)
+        latency_ms = (time.perf_counter() - start) * 1000
+        if record:
+            self.store.put(fingerprint, kwargs, _from_response(resp), latency_ms)
+            self.stats["recorded"] += 1
+        return resp
+
+    def create_completion(self, **kwargs):
+        fingerprint = request_fingerprint(kwargs)
+
+        if self.mode == "record":
+            return self._call_live(kwargs, fingerprint, record=True)
+
+        entry = self.store.get(fingerprint)
+        if entry is not None:
+            self.stats["replayed"] += 1
+            if self.latency_scale > 0 and entry.get("latency_ms"):
+                time.sleep(entry["latency_ms"] * self.latency_scale / 1000)
+            return _to_response(entry)
+
+        self.stats["misses"] += 1
+        if self.unknown_policy == "passthrough":
+            return self._call_live(kwargs, fingerprint, record=False)
+        if self.unknown_policy == "record":
+            return self._call_live(kwargs, fingerprint, record=True)
+        if self.unknown_policy == "stub":
+            return _to_response({"model": kwargs.get("model"), "content": self.stub_response})
+        raise CassetteMissError(f"No recorded response for request {fingerprint[:12]}")
+
+def wrap_client(client, config):
+    """Wrap the Groq client according to Config.LLM_CASSETTE_MODE"""
+    mode = config.LLM_CASSETTE_MODE
+    if mode not in ("record", "replay"):
+        return client
+    return CassetteClient(
+        client,
+        CassetteStore(config.LLM_CASSETTE_PATH),
+        mode,
+        config.LLM_REPLAY_LATENCY_SCALE,
+        config.LLM_REPLAY_UNKNOWN_POLICY
+    )
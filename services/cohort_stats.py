@@ -0,0 +1,200 @@
+"""Cohort statistics for benchmarking a profile against its peers.
+
+Profiles are grouped by role family (from the headline) and region (the last
+part of the location) at four levels, most specific first: role and region,
+role, region, everyone. For every cohort the database keeps a histogram per
+metric and a counter per taxonomy skill id. A profile save moves the user's
+contribution from its old buckets to its new ones, so a percentile is read
+from a few dozen bucket rows instead of parsing every stored profile.
+
+Histograms are exact up to EXACT_BUCKETS and log-spaced above that
+(BUCKETS_PER_DOUBLING per doubling, about 9% wide). Unlike a merging quantile
+sketch they support removing a value, which every profile edit needs.
+"""
+import math
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+METRICS = ("skill_count", "experience_count", "summary_length")
+METRIC_LABELS = {
+    "skill_count": "Skills listed",
+    "experience_count": "Experience entries",
+    "summary_length": "Summary length (characters)",
+}
+
+EXACT_BUCKETS = 16
+BUCKETS_PER_DOUBLING = 8
+
+# Checked in order against the headline at word starts; the first match wins
+ROLE_FAMILIES = (
+    ("student", ("student", "intern", "graduate", "aspiring", "fresher")),
+    ("data", ("data scien", "data analy", "data engineer", "machine learning", "ml engineer",
+              "ai engineer", "analytics", "statistician")),
+    ("engineering", ("engineer", "developer", "programmer", "architect", "devops", "sre",
+                     "software", "full stack", "fullstack", "backend", "frontend")),
+    ("design", ("designer", "ux", "ui", "product design", "graphic")),
+    ("product", ("product manager", "product owner", "product lead", "program manager")),
+    ("marketing", ("marketing", "marketer", "seo", "growth", "content", "brand", "social media")),
+    ("sales", ("sales", "account executive", "account manager", "business development", "bdr", "sdr")),
+    ("people", ("recruit", "talent", "human resources", "hr", "people partner")),
+    ("finance", ("finance", "financial", "accountant", "accounting", "auditor", "controller")),
+    ("management", ("manager", "director", "head of", "vp", "vice president", "chief", "ceo",
+                    "cto", "coo", "founder", "lead")),
+)
+_ROLE_PATTERNS = [
+    (family, re.compile(r"\b(?:" + "|".join(re.escape(phrase) for phrase in phrases) + ")"))
+    for family, phrases in ROLE_FAMILIES
+]
+UNKNOWN_LOCATIONS = {"", "not specified", "n/a", "remote", "anywhere", "worldwide"}
+MAX_REGION_CHARS = 40
+
+def role_family(headline: str) -> str:
+    headline = (headline or "").lower()
+    for family, pattern in _ROLE_PATTERNS:
+        if pattern.search(headline):
+            return family
+    return "other"
+
+def region_of(location: str) -> str:
+    """Last comma-separated part of a location ("Seattle, WA" -> "wa"), or "" if unknown"""
+    region = " ".join(str(location or "").split(",")[-1].lower().split())[:MAX_REGION_CHARS]
+    return "" if region in UNKNOWN_LOCATIONS else region
+
+def cohorts_for(profile_data: Dict) -> List[str]:
+    """Cohort keys of a profile, most specific first"""
+    role = role_family(profile_data.get("headline", ""))
+    region = region_of(profile_data.get("location", ""))
+    if not region:
+        return [f"role={role}", "all"]
+    return [f"role={role};region={region}", f"role={role}", f"region={region}", "all"]
+
+def cohort_label(cohort: str) -> str:
+    """Readable name of a cohort key, e.g. "engineering profiles in wa" """
+    parts = dict(part.split("=", 1) for part in cohort.split(";") if "=" in part)
+    label = f"{parts['role']} profiles" if "role" in parts else "profiles"
+    return f"{label} in {parts['region']}" if "region" in parts else label
+
+def profile_metrics(profile_data: Dict) -> Dict[str, int]:
+    return {
+        "skill_count": len(profile_data.get("skills") or []),
+        "experience_count": len(profile_data.get("experience") or []),
+        "summary_length": len((profile_data.get("summary") or "").strip()),
+    }
+
+def contribution(profile_data: Optional[Dict]) -> Optional[Dict]:
+    """What a profile adds to the cohort aggregates; None for no profile"""
+    if not profile_data:
+        return None
+    skill_ids = {skill.get("skill_id") for skill in profile_data.get("skills") or [] if isinstance(skill, dict)}
+    return {
+        "cohorts": cohorts_for(profile_data),
+        "metrics": profile_metrics(profile_data),
+        "skill_ids": sorted(skill_id for skill_id in skill_ids if skill_id is not None),
+    }
+
+def bucket_of(value: float) -> int:
+    value = max(0, int(value))
+    if value < EXACT_BUCKETS:
+        return value
+    return EXACT_BUCKETS + int(BUCKETS_PER_DOUBLING * math.log2(value / EXACT_BUCKETS))
+
+def bucket_bounds(bucket: int) -> Tuple[float, float]:
+    """[low, high) range of values in a bucket"""
+    if bucket < EXACT_BUCKETS:
+        return float(bucket), float(bucket + 1)
+    offset = bucket - EXACT_BUCKETS
+    return (EXACT_BUCKETS * 2 ** (offset / BUCKETS_PER_DOUBLING),
+            EXACT_BUCKETS * 2 ** ((offset + 1) / BUCKETS_PER_DOUBLING))
+
+def cohort_deltas(old: Optional[Dict], new: Optional[Dict]) -> Dict[str, Dict]:
+    """Count changes that move a user's contribution from old to new.
+
+    Returns {"sizes": {cohort: d}, "histograms": {(cohort, metric, bucket): d},
+    "skills": {(cohort, skill_id): d}} without zero entries.
+    """
+    deltas = {"sizes": {}, "histograms": {}, "skills": {}}
+    for sign, contrib in ((-1, old), (1, new)):
+        if not contrib:
+            continue
+        for cohort in contrib["cohorts"]:
+            deltas["sizes"][cohort] = deltas["sizes"].get(cohort, 0) + sign
+            for metric in METRICS:
+                key = (cohort, metric, bucket_of(contrib["metrics"].get(metric, 0)))
+                deltas["histograms"][key] = deltas["histograms"].get(key, 0) + sign
+            for skill_id in contrib["skill_ids"]:
+                key = (cohort, skill_id)
+                deltas["skills"][key] = deltas["skills"].get(key, 0) + sign
+    return {kind: {key: d for key, d in counts.items() if d} for kind, counts in deltas.items()}
+
+def percentile_rank(histogram: Dict[int, int], value: float) -> float:
+    """Percent of the cohort below value, counting half of its own bucket"""
+    total = sum(histogram.values())
+    if not total:
+        return 0.0
+    bucket = bucket_of(value)
+    below = sum(count for b, count in histogram.items() if b < bucket)
+    return 100.0 * (below + 0.5 * histogram.get(bucket, 0)) / total
+
+def quantile(histogram: Dict[int, int], q: float) -> float:
+    """Approximate value at quantile q, interpolated within the bucket"""
+    total = sum(histogram.values())
+    if not total:
+        return 0.0
+    target, seen = q * total, 0
+    for bucket in sorted(histogram):
+        count = histogram[bucket]
+        if seen + count >= target:
+            low, high = bucket_bounds(bucket)
+            if bucket < EXACT_BUCKETS:
+                return low
+            return low + (high - low) * (target - seen) / count
+        seen += count
+    return bucket_bounds(max(histogram))[0]
+
+def summarize_cohort(cohort: str, members: int, histograms: Dict[str, Dict[int, int]],
+                     top_skills: List[Tuple[int, int]], profile_data: Dict,
+                     own_skills: Set[int], skill_names: Dict[int, str]) -> Dict:
+    """Percentiles of a profile's metrics and the cohort's most common skills"""
+    metrics = profile_metrics(profile_data)
+    return {
+        "cohort": cohort,
+        "label": cohort_label(cohort),
+        "members": members,
+        "metrics": {
+            metric: {
+                "value": metrics[metric],
+                "percentile": round(percentile_rank(histograms.get(metric, {}), metrics[metric])),
+                "median": round(quantile(histograms.get(metric, {}), 0.5)),
+            }
+            for metric in METRICS
+        },
+        "top_skills": [
+            {
+                "skill_id": skill_id,
+                "name": skill_names.get(skill_id, str(skill_id)),
+                "share": count / members,
+                "listed": skill_id in own_skills,
+            }
+            for skill_id, count in top_skills
+        ],
+    }
+
+def _ordinal(n: int) -> str:
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+def format_cohort_percentiles(summary: Dict) -> str:
+    """Render cohort percentiles as agent context"""
+    lines = [f"Compared with {summary['members']} {summary['label']}:"]
+    for metric, stats in summary["metrics"].items():
+        lines.append(
+            f"- {METRIC_LABELS[metric]}: {stats['value']} "
+            f"({_ordinal(stats['percentile'])} percentile; median {stats['median']})"
+        )
+    if summary["top_skills"]:
+        skills = ", ".join(
+            f"{skill['name']} ({skill['share']:.0%}, {'listed' if skill['listed'] else 'missing'})"
+            for skill in summary["top_skills"]
+        )
+        lines.append(f"- Most common skills in this group: {skills}")
+    return "\n        ".join(lines)
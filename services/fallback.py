@@ -0,0 +1,112 @@
+"""Degraded answers for turns that miss their deadline.
+
+When the LLM cannot answer before Config.TURN_DEADLINE_SECONDS the user gets
+the best reply that can be produced locally instead of an error: a cached
+response (the prefetched profile review, for the plain review request only,
+or an earlier answer to the same question) or, failing that, rule-based tips
+derived from the profile itself.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+from config.settings import Config
+from services.job_matching import get_job_matcher
+from utils.helpers import profile_hash
+
+DEGRADED_NOTICE = (
+    "⏱️ Our AI coach is taking longer than usual, so here is a quick answer "
+    "prepared locally. Ask again in a moment for a full, personalized review."
+)
+
+# How many past interactions are searched for an answer to the same question
+HISTORY_LOOKBACK = 50
+MIN_SUMMARY_CHARS = 200
+MIN_SKILLS = 5
+MIN_DESCRIPTION_CHARS = 60
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+def normalize_question(text: str) -> str:
+    return " ".join(_PUNCTUATION_RE.sub(" ", text.lower()).split())
+
+def _cached_answer(db_manager, user_id: str, user_message: str, profile_data: Dict,
+                   allow_prefetched: bool) -> Optional[Tuple[str, Dict]]:
+    """A previously generated answer that still applies to this turn, with its token usage"""
+    if allow_prefetched and profile_data:
+        prefetched = db_manager.take_prefetched_response(user_id, profile_hash(profile_data))
+        if prefetched is not None:
+            return prefetched
+
+    question = normalize_question(user_message)
+    for interaction in db_manager.get_user_interaction_history(user_id, HISTORY_LOOKBACK):
+        if interaction["context_data"].get("degraded"):
+            continue
+        if normalize_question(interaction["message"]) == question:
+            # Already charged when it was first answered
+            return interaction["response"], {}
+    return None
+
+def profile_tips(profile_data: Dict) -> List[str]:
+    """Rule-based profile improvements that need no model call"""
+    if not profile_data:
+        return ["Add your LinkedIn profile so recommendations can be tailored to you."]
+
+    tips = []
+    headline = profile_data.get("headline") or ""
+    if len(headline.split()) < 5:
+        tips.append("**Headline**: expand it beyond a job title — add your specialty and the value you bring "
+                    "(e.g. *Data Engineer | Building reliable pipelines for analytics teams*).")
+
+    summary = profile_data.get("summary") or ""
+    if len(summary) < MIN_SUMMARY_CHARS:
+        tips.append("**About**: write 3–5 sentences covering what you do, a standout achievement "
+                    "and the kind of role or project you are looking for.")
+
+    experience = profile_data.get("experience") or []
+    if not experience:
+        tips.append("**Experience**: add your current and recent roles with company names and dates.")
+    else:
+        thin = [exp.get("title") or "a role" for exp in experience
+                if len(exp.get("description") or "") < MIN_DESCRIPTION_CHARS]
+        if thin:
+            tips.append(f"**Experience**: describe outcomes for {', '.join(thin[:3])} — "
+                        "start bullets with action verbs and include numbers where you can.")
+
+    if not profile_data.get("education"):
+        tips.append("**Education**: list your degree or relevant certifications.")
+
+    skills = profile_data.get("skills") or []
+    if len(skills) < MIN_SKILLS:
+        tips.append(f"**Skills**: list at least {MIN_SKILLS * 2} skills; recruiters filter on them.")
+
+    if not tips:
+        tips.append("Your profile covers the essentials. Keep experience entries focused on measurable "
+                    "results and share content regularly to stay visible.")
+    return tips
+
+def _job_fit_tips(profile_data: Dict) -> List[str]:
+    matcher = get_job_matcher()
+    matches = matcher.match(profile_data, Config.JOB_MATCH_TOP_K) if matcher and profile_data else []
+    tips = []
+    for match in matches[:3]:
+        company = f" at {match['company']}" if match["company"] else ""
+        missing = ", ".join(match["missing_skills"][:5])
+        tip = f"**{match['title']}{company}** looks like a good fit"
+        tips.append(f"{tip}; consider building up: {missing}." if missing else f"{tip}.")
+    return tips
+
+def build_degraded_response(db_manager, user_id: str, user_message: str, agent_info: Dict,
+                            profile_data: Dict, allow_prefetched: bool = False) -> Tuple[str, Dict]:
+    """Best local answer for a turn whose LLM call missed the deadline, and its token usage.
+
+    allow_prefetched lets the turn consume the prefetched profile review; only
+    pass it for the plain review request the prefetch was generated for.
+    """
+    cached = _cached_answer(db_manager, user_id, user_message, profile_data, allow_prefetched)
+    if cached:
+        response, usage = cached
+        return f"{DEGRADED_NOTICE}\n\n{response}", usage
+
+    tips = profile_tips(profile_data)
+    if agent_info["id"] == "job_fit_analyzer":
+        tips = _job_fit_tips(profile_data) + tips
+    return DEGRADED_NOTICE + "\n\n" + "\n".join(f"- {tip}" for tip in tips), {}
@@ -0,0 +1,189 @@
+import csv
+import json
+import os
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional
+import numpy as np
+import streamlit as st
+from config.settings import Config
+from services.skills import SkillIndex, get_skill_index
+
+TOKEN_RE = re.compile(r"[a-z0-9+#.]+")
+
+# Relative weight of each field when building feature vectors
+FIELD_WEIGHTS = {"skill": 3.0, "title": 2.0, "text": 1.0}
+
+def normalize_skill(name: str) -> str:
+    return " ".join(name.lower().split())
+
+def _split_skills(value) -> List[str]:
+    if isinstance(value, list):
+        items = value
+    elif value:
+        items = re.split(r"[;,|]", str(value))
+    else:
+        items = []
+    return [normalize_skill(str(item)) for item in items if str(item).strip()]
+
+def _tokens(text: str) -> List[str]:
+    return [token.strip(".") for token in TOKEN_RE.findall(text.lower()) if len(token.strip(".")) > 1]
+
+def iter_postings(path: str) -> Iterator[Dict]:
+    """Stream job postings from a JSONL or CSV file"""
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                yield row
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+class JobMatcher:
+    """Hashed TF-IDF index over a job-posting corpus.
+
+    Postings are stored as an inverted index (feature -> posting ids and
+    weights) so one profile is scored against every posting with a single
+    vectorized scatter-add, then the top-k are selected with argpartition.
+    """
+
+    def __init__(self, hash_bits: int = 20, skill_index: Optional[SkillIndex] = None):
+        self.n_features = 1 << hash_bits
+        self.skill_index = skill_index or SkillIndex([])
+        self.postings: List[Dict] = []
+        # Integer skill keys per posting, so overlap is a plain set operation
+        self.posting_skills: List[frozenset] = []
+        self.idf = np.zeros(0, dtype=np.float32)
+        self._feature_ptr = np.zeros(1, dtype=np.int64)
+        self._doc_ids = np.zeros(0, dtype=np.int32)
+        self._weights = np.zeros(0, dtype=np.float32)
+
+    def _features(self, skills: Iterable[int], title: str, text: str) -> Counter:
+        counts: Counter = Counter()
+        for skill in skills:
+            counts[self._hash(f"s:{skill}")] += FIELD_WEIGHTS["skill"]
+        for token in _tokens(title):
+            counts[self._hash("w:" + token)] += FIELD_WEIGHTS["title"]
+        for token in _tokens(text):
+            counts[self._hash("w:" + token)] += FIELD_WEIGHTS["text"]
+        return counts
+
+    def _hash(self, term: str) -> int:
+        return zlib.crc32(term.encode("utf-8")) & (self.n_features - 1)
+
+    def build(self, postings) -> "JobMatcher":
+        """Index an iterable of posting dicts"""
+        doc_ids: List[np.ndarray] = []
+        feature_ids: List[np.ndarray] = []
+        values: List[np.ndarray] = []
+
+        for posting in postings:
+            skills = frozenset(self.skill_index.skill_key(name) for name in _split_skills(posting.get("skills")))
+            title = posting.get("title") or ""
+            counts = self._features(skills, title, posting.get("description") or "")
+            if not counts:
+                continue
+            doc_id = len(self.postings)
+            self.postings.append({
+                "id": posting.get("id", doc_id),
+                "title": title,
+                "company": posting.get("company") or "",
+                "location": posting.get("location") or ""
+            })
+            self.posting_skills.append(skills)
+            doc_ids.append(np.full(len(counts), doc_id, dtype=np.int32))
+            feature_ids.append(np.fromiter(counts.keys(), dtype=np.int64, count=len(counts)))
+            values.append(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+
+        n_docs = len(self.postings)
+        if not n_docs:
+            return self
+
+        docs = np.concatenate(doc_ids)
+        features = np.concatenate(feature_ids)
+        tf = np.log1p(np.concatenate(values))
+
+        df = np.bincount(features, minlength=self.n_features)
+        self.idf = (np.log((n_docs + 1) / (df + 1)) + 1).astype(np.float32)
+        weights = tf * self.idf[features]
+
+        # L2-normalize each posting vector so scores are cosine similarities
+        norms = np.sqrt(np.bincount(docs, weights=weights * weights, minlength=n_docs))
+        weights = (weights / norms[docs]).astype(np.float32)
+
+        order = np.argsort(features, kind="stable")
+        self._doc_ids = docs[order]
+        self._weights = weights[order]
+        self._feature_ptr = np.zeros(self.n_features + 1, dtype=np.int64)
+        np.cumsum(df, out=self._feature_ptr[1:])
+        return self
+
+    def profile_skills(self, profile_data: Dict) -> frozenset:
+        return self.skill_index.skill_ids(profile_data)
+
+    def match(self, profile_data: Dict, top_k: int = 5) -> List[Dict]:
+        """Return the top-k postings for a profile with overlapping and missing skills"""
+        if not self.postings or not profile_data:
+            return []
+
+        skills = self.profile_skills(profile_data)
+        titles = " ".join([profile_data.get("headline", "")] +
+                          [exp.get("title", "") for exp in profile_data.get("experience", [])])
+        text = " ".join(exp.get("description", "") for exp in profile_data.get("experience", []))
+        counts = self._features(skills, titles, text)
+        if not counts:
+            return []
+
+        features = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        query = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts))) * self.idf[features]
+        query /= np.linalg.norm(query) or 1.0
+
+        starts, ends = self._feature_ptr[features], self._feature_ptr[features + 1]
+        lengths = ends - starts
+        if not lengths.sum():
+            return []
+        # Gather every posting entry for the query features in one pass
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        contributions = self._weights[offsets] * np.repeat(query, lengths)
+        scores = np.bincount(self._doc_ids[offsets], weights=contributions, minlength=len(self.postings))
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        skill_name = self.skill_index.name_for
+        results = []
+        for doc_id in top:
+            if scores[doc_id] <= 0:
+                break
+            posting_skills = self.posting_skills[doc_id]
+            results.append({
+                **self.postings[doc_id],
+                "score": float(scores[doc_id]),
+                "matching_skills": sorted(map(skill_name, posting_skills & skills)),
+                "missing_skills": sorted(map(skill_name, posting_skills - skills))
+            })
+        return results
+
+def format_job_matches(matches: List[Dict]) -> str:
+    """Render job matches as agent context"""
+    lines = []
+    for match in matches:
+        company = f" at {match['company']}" if match["company"] else ""
+        lines.append(
+            f"- {match['title']}{company} (score {match['score']:.2f}); "
+            f"matching skills: {', '.join(match['matching_skills']) or 'none'}; "
+            f"missing skills: {', '.join(match['missing_skills']) or 'none'}"
+        )
+    return "\n        ".join(lines)
+
+@st.cache_resource
+def get_job_matcher() -> Optional[JobMatcher]:
+    """Load the job-posting index configured by JOB_CORPUS_PATH, if any"""
+    path = Config.JOB_CORPUS_PATH
+    if not path or not os.path.exists(path):
+        return None
+    return JobMatcher(Config.JOB_MATCH_HASH_BITS, get_skill_index()).build(iter_postings(path))
@@ -0,0 +1,93 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import streamlit as st
+from config.settings import Config
+
+class Job:
+    """A unit of background work and its outcome"""
+
+    def __init__(self, job_id: str, key: str):
+        self.id = job_id
+        self.key = key
+        self.status = "pending"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.done_event = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed")
+
+class JobRunner:
+    """In-process job queue with a worker pool.
+
+    Jobs outlive the Streamlit script run that submitted them, so a rerun or
+    disconnect no longer aborts an in-flight LLM call. Submissions with the
+    same key are deduplicated while the original job is queued, running or
+    recently finished.
+    """
+
+    def __init__(self, max_workers: int = 4, retention_seconds: float = 600):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._retention_seconds = retention_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._by_key: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, fn: Callable, *args, **kwargs) -> str:
+        """Queue fn(*args, **kwargs) and return the job id"""
+        with self._lock:
+            self._prune()
+            existing_id = self._by_key.get(key)
+            existing = self._jobs.get(existing_id) if existing_id else None
+            if existing and existing.status != "failed":
+                return existing.id
+
+            job = Job(str(uuid.uuid4()), key)
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job: Job, fn: Callable, args, kwargs) -> None:
+        job.status = "running"
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            job.done_event.set()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by id, or None if unknown or expired"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """Wait up to timeout seconds for a job to finish and return it"""
+        job = self.get(job_id)
+        if job:
+            job.done_event.wait(timeout)
+        return job
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self._retention_seconds
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at and job.finished_at < cutoff:
+                del self._jobs[job_id]
+                if self._by_key.get(job.key) == job_id:
+                    del self._by_key[job.key]
+
+@st.cache_resource
+def get_job_runner() -> JobRunner:
+    """Process-wide job runner shared by all sessions"""
+    return JobRunner(Config.JOB_WORKERS, Config.JOB_RETENTION_SECONDS)
@@ -0,0 +1,136 @@
+import csv
+import io
+import os
+import sqlite3
+import zipfile
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+# Bounds on what is kept from one archive so memory stays constant per import
+MAX_POSITIONS = 50
+MAX_EDUCATION = 20
+MAX_SKILLS = 100
+
+class LinkedInImportError(Exception):
+    """Raised when an archive is not a usable LinkedIn data export"""
+
+def _find_member(archive: zipfile.ZipFile, filename: str) -> Optional[str]:
+    """Find a CSV in the archive by base name, ignoring folders and case"""
+    target = filename.lower()
+    for name in archive.namelist():
+        if os.path.basename(name).lower() == target:
+            return name
+    return None
+
+def iter_export_rows(archive: zipfile.ZipFile, filename: str, header_key: str) -> Iterator[Dict[str, str]]:
+    """Stream rows of one CSV inside the archive without extracting it.
+
+    Some export files start with free-text "Notes:" lines, so rows are skipped
+    until the header containing header_key is found.
+    Unreadable files raise LinkedInImportError.
+    """
+    member = _find_member(archive, filename)
+    if not member:
+        return
+    try:
+        with archive.open(member) as raw:
+            reader = csv.reader(io.TextIOWrapper(raw, encoding="utf-8-sig", newline=""))
+            header = None
+            for row in reader:
+                if header is None:
+                    if header_key in row:
+                        header = [column.strip() for column in row]
+                    continue
+                if any(cell.strip() for cell in row):
+                    yield {column: (row[i].strip() if i < len(row) else "") for i, column in enumerate(header)}
+    except (csv.Error, UnicodeDecodeError, zipfile.BadZipFile) as e:
+        # Malformed CSV, text that is not UTF-8 or a corrupt member
+        raise LinkedInImportError(f"Could not read {filename}: {e}")
+
+def _duration(start: str, end: str) -> str:
+    if not start and not end:
+        return "N/A"
+    return f"{start or 'Unknown'} - {end or 'Present'}"
+
+def parse_export(source) -> Dict:
+    """Map a LinkedIn data-export ZIP (path or file object) to profile_data"""
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile as e:
+        raise LinkedInImportError(f"Not a ZIP archive: {e}")
+
+    with archive:
+        profile_row = next(iter_export_rows(archive, "Profile.csv", "First Name"), None)
+        if profile_row is None:
+            raise LinkedInImportError("Profile.csv not found in export")
+
+        experience = []
+        for row in iter_export_rows(archive, "Positions.csv", "Company Name"):
+            if len(experience) >= MAX_POSITIONS:
+                break
+            experience.append({
+                "title": row.get("Title") or "N/A",
+                "company": row.get("Company Name") or "N/A",
+                "duration": _duration(row.get("Started On", ""), row.get("Finished On", "")),
+                "description": row.get("Description") or "",
+                "location": row.get("Location", "")
+            })
+
+        education = []
+        for row in iter_export_rows(archive, "Education.csv", "School Name"):
+            if len(education) >= MAX_EDUCATION:
+                break
+            school = row.get("School Name") or "N/A"
+            education.append({
+                "school": school,
+                "degree": row.get("Degree Name") or "Degree",
+                "year": row.get("End Date") or "N/A",
+                "details": row.get("Notes") or row.get("Activities") or f"Studied at {school}"
+            })
+
+        skills = []
+        seen = set()
+        for row in iter_export_rows(archive, "Skills.csv", "Name"):
+            if len(skills) >= MAX_SKILLS:
+                break
+            name = row.get("Name", "")
+            if name and name.lower() not in seen:
+                seen.add(name.lower())
+                skills.append({"name": name, "endorsements": 0})
+
+    full_name = " ".join(
+        part for part in (profile_row.get("First Name", ""), profile_row.get("Last Name", "")) if part
+    )
+    headline = profile_row.get("Headline") or "Not provided"
+    return {
+        "fullName": full_name or "Unknown",
+        "headline": headline,
+        "location": profile_row.get("Geo Location") or profile_row.get("Location") or "Not specified",
+        "summary": profile_row.get("Summary") or f"Professional with experience in {headline.lower()}",
+        "industry": profile_row.get("Industry", ""),
+        "experience": experience,
+        "education": education,
+        "skills": skills,
+        "input_method": "linkedin_export"
+    }
+
+def import_export(db_manager, user_id: str, source) -> Dict:
+    """Parse an export archive and upsert it as the user's profile"""
+    profile_data = parse_export(source)
+    _, career_goals, preferences = db_manager.load_user_profile(user_id)
+    db_manager.save_user_profile(user_id, profile_data, career_goals, preferences)
+    return profile_data
+
+def default_user_id(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+def import_exports(db_manager, paths: Iterable[str],
+                   user_id_for: Callable[[str], str] = default_user_id) -> Iterator[Dict]:
+    """Bulk-import archives one at a time, yielding a result per archive"""
+    for path in paths:
+        user_id = user_id_for(path)
+        try:
+            profile_data = import_export(db_manager, user_id, path)
+            yield {"path": path, "user_id": user_id, "ok": True,
+                   "positions": len(profile_data["experience"]), "skills": len(profile_data["skills"])}
+        except (LinkedInImportError, OSError, sqlite3.Error) as e:
+            yield {"path": path, "user_id": user_id, "ok": False, "error": str(e)}
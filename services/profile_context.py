@@ -0,0 +1,116 @@
+"""Per-user cache of artifacts derived from a profile.
+
+The agent context embeds the profile as indented JSON and, for the career
+advisor, the top job matches. Both are cached per user: the JSON is kept as
+one rendered fragment per top-level field, and profile saves drop only the
+fragments (and matches) whose sections changed. A headline edit on a large
+profile re-renders one line instead of every experience entry.
+
+Listeners only see saves made by this process, so every cached artifact also
+keeps a copy of the values it was built from and is reused only while those
+still equal the profile being rendered.
+"""
+import copy
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+import streamlit as st
+from utils.profile_diff import section_of
+
+# Sections the job-matching score depends on
+JOB_MATCH_SECTIONS = {"headline", "experience", "skills"}
+
+def render_field(key: str, value) -> str:
+    """One top-level field exactly as json.dumps(profile, indent=2) prints it"""
+    rendered = json.dumps(value, indent=2).replace("\n", "\n  ")
+    return f"  {json.dumps(key)}: {rendered}"
+
+class ProfileContextCache:
+    """Rendered profile fragments and job matches per user, invalidated by section"""
+
+    def __init__(self, max_users: int = 1024):
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._users: "OrderedDict[str, Dict]" = OrderedDict()
+        self._stats = {"fields_rendered": 0, "fields_reused": 0, "match_hits": 0, "match_misses": 0}
+
+    def _entry(self, user_id: str) -> Dict:
+        entry = self._users.get(user_id)
+        if entry is None:
+            entry = self._users[user_id] = {"fields": {}, "job_matches": None, "match_inputs": None,
+                                            "generation": 0}
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        return entry
+
+    def on_profile_saved(self, user_id: str, profile_data: Optional[Dict], diff: Dict) -> None:
+        """Profile listener: forget artifacts of the changed sections only"""
+        changed = set(diff["changed_sections"])
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return
+            entry["fields"] = {key: cached for key, cached in entry["fields"].items()
+                               if section_of(key) not in changed}
+            if changed & JOB_MATCH_SECTIONS:
+                entry["job_matches"] = None
+                entry["generation"] += 1
+
+    def render_profile(self, user_id: str, profile_data: Dict) -> str:
+        """The profile as indented JSON, reusing fragments of unchanged fields"""
+        if not profile_data:
+            return json.dumps(profile_data, indent=2)
+        with self._lock:
+            fields = self._entry(user_id)["fields"]
+            fragments = []
+            for key, value in profile_data.items():
+                cached = fields.get(key)
+                # Compare values too: saves from other processes never reach the listener
+                if cached is not None and cached[0] == value:
+                    fragment = cached[1]
+                    self._stats["fields_reused"] += 1
+                else:
+                    fragment = render_field(key, value)
+                    fields[key] = (copy.deepcopy(value), fragment)
+                    self._stats["fields_rendered"] += 1
+                fragments.append(fragment)
+        return "{\n" + ",\n".join(fragments) + "\n}"
+
+    def job_matches(self, user_id: str, profile_data: Dict,
+                    compute: Callable[[], List[Dict]]) -> List[Dict]:
+        """Cached job matches, recomputed after headline, experience or skills edits"""
+        inputs = {key: profile_data.get(key) for key in JOB_MATCH_SECTIONS}
+        with self._lock:
+            entry = self._entry(user_id)
+            matches, generation = entry["job_matches"], entry["generation"]
+            if matches is not None and entry["match_inputs"] != inputs:
+                matches = None
+            self._stats["match_hits" if matches is not None else "match_misses"] += 1
+        if matches is None:
+            matches = compute()
+            with self._lock:
+                entry = self._entry(user_id)
+                # Skip storing if the profile changed while matching
+                if entry["generation"] == generation:
+                    entry["job_matches"] = matches
+                    entry["match_inputs"] = copy.deepcopy(inputs)
+        return matches
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"users": len(self._users), **self._stats}
+
+@st.cache_resource
+def get_profile_context_cache(_db_manager) -> ProfileContextCache:
+    """Process-wide cache, kept current through the database's profile and clear listeners"""
+    cache = ProfileContextCache()
+    _db_manager.add_profile_listener(cache.on_profile_saved)
+    _db_manager.add_clear_listener(cache.invalidate_user)
+    return cache
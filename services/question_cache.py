@@ -0,0 +1,241 @@
+"""Cross-user cache of answers to generic questions.
+
+Questions are normalized (lowercased, punctuation and stopwords dropped) and
+shingled into per-word character trigrams, so "How do I write a good
+headline?" and "how to write a good headline" share nearly all shingles.
+Each question gets a MinHash signature; signatures are split into LSH bands
+and bucketed in memory, so a lookup hashes one question and compares it only
+against the few entries sharing a band. Entries are persisted in the shared
+question_cache table and reloaded on start-up.
+"""
+import atexit
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+import numpy as np
+import streamlit as st
+from config.settings import Config
+
+_WORD_RE = re.compile(r"[a-z0-9+#]+")
+
+STOPWORDS = {
+    "a", "an", "the", "i", "me", "my", "you", "your", "we", "our", "it", "its", "is", "are", "be",
+    "do", "does", "how", "what", "whats", "which", "should", "can", "could", "would", "to", "of",
+    "in", "on", "for", "and", "or", "with", "about", "any", "some", "there", "this", "that",
+    "please", "tips", "good", "great", "best", "really", "linkedin",
+}
+
+# Pending hit counts are written to SQLite after this many hits or seconds,
+# whichever comes first, and on shutdown
+HIT_FLUSH_BATCH = 32
+HIT_FLUSH_SECONDS = 60
+
+_HASH_MASK = np.uint64(0xFFFFFFFF)
+
+def normalize_question(text: str) -> List[str]:
+    """Content words of a question, in order"""
+    return [word for word in _WORD_RE.findall(text.lower()) if word not in STOPWORDS]
+
+def shingles(words: List[str]) -> Set[str]:
+    """Character trigrams of each word, padded so short words still count"""
+    result = set()
+    for word in words:
+        padded = f"^{word}$"
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+class QuestionCache:
+    """MinHash/LSH index of generic questions and their shared answers"""
+
+    def __init__(self, db_manager, num_perm: int = 64, bands: int = 16, threshold: float = 0.7,
+                 max_entries: int = 5000, ttl_days: int = 30, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.db_manager = db_manager
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = timedelta(days=ttl_days)
+        self.ttl_days = ttl_days
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 32, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 32, num_perm, dtype=np.uint64)
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._buckets: List[Dict[bytes, Set[int]]] = [{} for _ in range(bands)]
+        self._pending_hits: Dict[int, List] = {}
+        self._pending_count = 0
+        self._last_flush = time.monotonic()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._load()
+
+    def signature(self, question: str) -> Optional[np.ndarray]:
+        """MinHash signature of a question, or None if it has no content words"""
+        grams = shingles(normalize_question(question))
+        if not grams:
+            return None
+        hashes = np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams),
+                             dtype=np.uint64, count=len(grams))
+        permuted = (hashes[:, None] * self._a + self._b) & _HASH_MASK
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def cacheable(self, question: str) -> bool:
+        """Whether a question has content words to match on"""
+        return bool(normalize_question(question))
+    
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [band.tobytes() for band in signature.reshape(self.bands, self.rows)]
+
+    def _add(self, entry: Dict) -> None:
+        self._entries[entry["id"]] = entry
+        for band, key in enumerate(self._band_keys(entry["signature"])):
+            self._buckets[band].setdefault(key, set()).add(entry["id"])
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        self._pending_hits.pop(entry_id, None)
+        for band, key in enumerate(self._band_keys(entry["signature"])):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def _load(self) -> None:
+        for row in self.db_manager.load_question_cache(self.ttl_days):
+            signature = np.frombuffer(row["signature"], dtype=np.uint32)
+            if signature.size != self.num_perm:
+                continue  # written with different MinHash settings
+            self._add({
+                "id": row["id"],
+                "agent_id": row["agent_used"],
+                "signature": signature,
+                "response": row["response"],
+                "usage": row["usage"],
+                "created_at": datetime.fromisoformat(row["created_at"])
+            })
+        # Rows come least recently used first, matching the LRU order
+        overflow = list(self._entries)[:max(0, len(self._entries) - self.max_entries)]
+        for entry_id in overflow:
+            self._remove(entry_id)
+        self.db_manager.delete_question_cache_entries(overflow)
+
+    def _find(self, signature: np.ndarray, agent_id: str) -> Optional[Dict]:
+        """Most similar live entry for the agent above the threshold"""
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates |= self._buckets[band].get(key, set())
+
+        best, best_similarity = None, self.threshold
+        expired_before = datetime.now() - self.ttl
+        for entry_id in candidates:
+            entry = self._entries[entry_id]
+            if entry["agent_id"] != agent_id or entry["created_at"] < expired_before:
+                continue
+            similarity = float(np.count_nonzero(entry["signature"] == signature)) / self.num_perm
+            if similarity >= best_similarity:
+                best, best_similarity = entry, similarity
+        return {**best, "similarity": best_similarity} if best else None
+
+    def lookup(self, question: str, agent_id: str) -> Optional[Dict]:
+        """Return {"response", "usage", "similarity"} for a near-duplicate question, or None"""
+        signature = self.signature(question)
+        if signature is None:
+            return None
+        flush = None
+        with self._lock:
+            match = self._find(signature, agent_id)
+            if match is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._entries.move_to_end(match["id"])
+            pending = self._pending_hits.setdefault(match["id"], [0, None])
+            pending[0] += 1
+            pending[1] = datetime.now().isoformat()
+            self._pending_count += 1
+            if (self._pending_count >= HIT_FLUSH_BATCH
+                    or time.monotonic() - self._last_flush >= HIT_FLUSH_SECONDS):
+                flush = self._take_pending()
+        if flush:
+            self.db_manager.record_question_cache_hits({k: tuple(v) for k, v in flush.items()})
+        return {"response": match["response"], "usage": match["usage"], "similarity": match["similarity"]}
+
+    def store(self, question: str, agent_id: str, response: str, usage: Dict = None) -> bool:
+        """Cache the answer to a generic question unless a near-duplicate is already cached"""
+        signature = self.signature(question)
+        if signature is None:
+            return False
+        with self._lock:
+            if self._find(signature, agent_id) is not None:
+                return False
+        entry_id = self.db_manager.save_question_cache_entry(
+            agent_id, " ".join(normalize_question(question)), signature.tobytes(), response, usage
+        )
+        with self._lock:
+            self._add({
+                "id": entry_id,
+                "agent_id": agent_id,
+                "signature": signature,
+                "response": response,
+                "usage": usage or {},
+                "created_at": datetime.now()
+            })
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted_id = next(iter(self._entries))
+                self._remove(evicted_id)
+                evicted.append(evicted_id)
+            self._evictions += len(evicted)
+        self.db_manager.delete_question_cache_entries(evicted)
+        return True
+
+    def _take_pending(self) -> Dict[int, List]:
+        """Detach pending hits for writing; caller holds the lock"""
+        pending, self._pending_hits = self._pending_hits, {}
+        self._pending_count = 0
+        self._last_flush = time.monotonic()
+        return pending
+    
+    def flush(self) -> None:
+        """Persist pending hit counts"""
+        with self._lock:
+            flush = self._take_pending()
+        if flush:
+            self.db_manager.record_question_cache_hits({k: tuple(v) for k, v in flush.items()})
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions
+            }
+
+@st.cache_resource
+def get_question_cache(_db_manager) -> QuestionCache:
+    """Process-wide question cache shared by all sessions"""
+    cache = QuestionCache(
+        _db_manager,
+        Config.QUESTION_CACHE_NUM_PERM,
+        Config.QUESTION_CACHE_BANDS,
+        Config.QUESTION_CACHE_THRESHOLD,
+        Config.QUESTION_CACHE_MAX_ENTRIES,
+        Config.QUESTION_CACHE_TTL_DAYS
+    )
+    atexit.register(cache.flush)
+    return cache
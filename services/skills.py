@@ -0,0 +1,219 @@
+"""Skills taxonomy and canonicalization.
+
+Free-text skill names ("JS", "Javascript", "javascript ") are mapped to
+stable integer ids from data/skills_taxonomy.json. Lookup tries, in order:
+an exact alias match in a character trie, a fuzzy match over character
+trigrams of every alias, and the longest alias that prefixes the name at a
+word boundary ("python developer" -> Python). Names that match nothing keep
+their cleaned-up text and no id.
+
+Fuzzy and prefix matches are lossy ("Pythonic" -> Python), so they are only
+used for job-posting skills. Profile skills keep the name the user entered
+and only gain a skill_id and canonical_name when the name is an exact alias.
+"""
+import json
+import os
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional
+import streamlit as st
+from config.settings import Config
+
+_END = ""  # trie key marking the end of an alias
+_STRIP_CHARS = " ,;:!?()[]{}\"'*"
+
+# Shorter aliases are only matched exactly, never fuzzily or as a prefix
+FUZZY_MIN_CHARS = 4
+PREFIX_MIN_CHARS = 3
+# Bound on memoized lookups; cleared wholesale when full
+MEMO_SIZE = 50000
+
+def normalize_skill_name(name: str) -> str:
+    """Lowercase, collapse whitespace and trim surrounding punctuation"""
+    return " ".join(str(name).lower().replace("_", " ").split()).strip(_STRIP_CHARS)
+
+def _trigrams(text: str) -> List[str]:
+    padded = f"  {text} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+class SkillIndex:
+    """Alias trie plus trigram index over a skills taxonomy"""
+
+    def __init__(self, skills: List[Dict], fuzzy_threshold: float = 0.7):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.names: Dict[int, str] = {}
+        self._trie: Dict = {}
+        self._aliases: List[str] = []
+        self._alias_ids: List[int] = []
+        self._alias_grams: List[int] = []
+        self._gram_index: Dict[str, List[int]] = {}
+        self._memo: Dict[str, Optional[int]] = {}
+        self._unknown_keys: Dict[str, int] = {}
+        self._unknown_names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+        for skill in skills:
+            skill_id = int(skill["id"])
+            self.names[skill_id] = skill["name"]
+            # The canonical name is always an alias so canonicalization is idempotent
+            for alias in {normalize_skill_name(skill["name"]), *map(normalize_skill_name, skill.get("aliases", []))}:
+                if alias:
+                    self._add_alias(alias, skill_id)
+
+    @classmethod
+    def from_file(cls, path: str, fuzzy_threshold: float = 0.7) -> "SkillIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["skills"], fuzzy_threshold)
+
+    def _add_alias(self, alias: str, skill_id: int) -> None:
+        node = self._trie
+        for char in alias:
+            node = node.setdefault(char, {})
+        if _END in node:
+            return  # first definition wins
+        node[_END] = skill_id
+
+        if len(alias) >= FUZZY_MIN_CHARS:
+            alias_index = len(self._aliases)
+            self._aliases.append(alias)
+            self._alias_ids.append(skill_id)
+            grams = set(_trigrams(alias))
+            self._alias_grams.append(len(grams))
+            for gram in grams:
+                self._gram_index.setdefault(gram, []).append(alias_index)
+
+    def _exact(self, name: str) -> Optional[int]:
+        node = self._trie
+        for char in name:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node.get(_END)
+
+    def _longest_prefix(self, name: str) -> Optional[int]:
+        node, best = self._trie, None
+        for i, char in enumerate(name):
+            node = node.get(char)
+            if node is None:
+                break
+            at_boundary = i + 1 == len(name) or name[i + 1] == " "
+            if _END in node and at_boundary and i + 1 >= PREFIX_MIN_CHARS:
+                best = node[_END]
+        return best
+
+    def _fuzzy(self, name: str) -> Optional[int]:
+        if len(name) < FUZZY_MIN_CHARS:
+            return None
+        grams = set(_trigrams(name))
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._gram_index.get(gram, ()))
+        best, best_score = None, self.fuzzy_threshold
+        for alias_index, count in shared.items():
+            # Dice coefficient over trigram sets
+            score = 2 * count / (len(grams) + self._alias_grams[alias_index])
+            if score >= best_score:
+                best, best_score = self._alias_ids[alias_index], score
+        return best
+
+    def lookup_id(self, name: str) -> Optional[int]:
+        """Taxonomy id for a free-text skill name, or None if it matches nothing"""
+        normalized = normalize_skill_name(name)
+        if normalized in self._memo:
+            return self._memo[normalized]
+        skill_id = None
+        if normalized:
+            skill_id = self._exact(normalized)
+            if skill_id is None:
+                skill_id = self._fuzzy(normalized)
+            if skill_id is None:
+                skill_id = self._longest_prefix(normalized)
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[normalized] = skill_id
+        return skill_id
+
+    def exact_id(self, name: str) -> Optional[int]:
+        """Taxonomy id when the name is exactly one of the aliases, else None"""
+        normalized = normalize_skill_name(name)
+        return self._exact(normalized) if normalized else None
+
+    def canonicalize(self, name: str) -> Optional[Dict]:
+        """Return {"id", "name"} for a known skill, or None"""
+        skill_id = self.lookup_id(name)
+        return {"id": skill_id, "name": self.names[skill_id]} if skill_id is not None else None
+
+    def canonicalize_batch(self, names: Iterable[str]) -> List[Optional[int]]:
+        """Taxonomy ids for many names; each distinct name is resolved once"""
+        resolved: Dict[str, Optional[int]] = {}
+        result = []
+        for name in names:
+            if name not in resolved:
+                resolved[name] = self.lookup_id(name)
+            result.append(resolved[name])
+        return result
+
+    def skill_key(self, name: str, fuzzy: bool = True) -> int:
+        """Integer key for set comparisons: the taxonomy id, or a negative id
+        interned for this process when the name is not in the taxonomy"""
+        skill_id = self.lookup_id(name) if fuzzy else self.exact_id(name)
+        if skill_id is not None:
+            return skill_id
+        normalized = normalize_skill_name(name)
+        with self._lock:
+            key = self._unknown_keys.get(normalized)
+            if key is None:
+                key = self._unknown_keys[normalized] = -(len(self._unknown_keys) + 1)
+                self._unknown_names[key] = normalized
+            return key
+
+    def name_for(self, key: int) -> str:
+        return self.names.get(key) or self._unknown_names.get(key, "")
+
+    def canonicalize_skills(self, skills: List[Dict]) -> List[Dict]:
+        """Tag each skill with skill_id and canonical_name on an exact alias match.
+
+        Names, order and entries are kept as entered; skills without an exact
+        match get skill_id None. Running the result through again returns it
+        unchanged.
+        """
+        result = []
+        for skill in skills or []:
+            entry = dict(skill) if isinstance(skill, dict) else {"name": str(skill), "endorsements": 0}
+            skill_id = self.exact_id(entry.get("name", ""))
+            entry["skill_id"] = skill_id
+            if skill_id is not None:
+                entry["canonical_name"] = self.names[skill_id]
+            else:
+                entry.pop("canonical_name", None)
+            result.append(entry)
+        return result
+
+    def canonicalize_profile(self, profile_data: Dict) -> Dict:
+        """Canonicalize a profile's skills in place and return it"""
+        if profile_data and profile_data.get("skills"):
+            profile_data["skills"] = self.canonicalize_skills(profile_data["skills"])
+        return profile_data
+
+    def canonicalize_profiles(self, profiles: Iterable[Dict]) -> Iterator[Dict]:
+        """Canonicalize a stream of profiles, sharing lookups across all of them"""
+        for profile_data in profiles:
+            yield self.canonicalize_profile(profile_data)
+
+    def skill_ids(self, profile_data: Dict) -> frozenset:
+        """Integer skill keys of a profile, using stored ids when present"""
+        keys = set()
+        for skill in (profile_data or {}).get("skills", []):
+            if skill.get("skill_id") is not None:
+                keys.add(skill["skill_id"])
+            elif normalize_skill_name(skill.get("name", "")):
+                keys.add(self.skill_key(skill["name"], fuzzy=False))
+        return frozenset(keys)
+
+@st.cache_resource
+def get_skill_index() -> SkillIndex:
+    """Taxonomy index from SKILLS_TAXONOMY_PATH; empty if the file is missing"""
+    path = Config.SKILLS_TAXONOMY_PATH
+    if not path or not os.path.exists(path):
+        return SkillIndex([])
+    return SkillIndex.from_file(path, Config.SKILL_FUZZY_THRESHOLD)
@@ -1,6 +1,10 @@
 import streamlit as st
-from typing import Dict, List
+from typing import Dict, List, Optional
 from config.settings import Config
+from services.jobs import get_job_runner
+from services.linkedin_import import LinkedInImportError, parse_export
+from utils.profile_diff import describe_diff
+import hashlib
 import json
 
 class ChatInterface:
@@ -27,48 +31,78 @@ class ChatInterface:
             
             st.info("💡 **Tip:** The system automatically routes your question to the most relevant agent based on your keywords!")
     
-    def render_profile_input(self):
-        """Render manual profile input section"""
-        st.header("📝 LinkedIn Profile Information")
+    def render_profile_input(self, existing: Optional[Dict] = None):
+        """Render manual profile input section, prefilled when editing an existing profile"""
+        st.header("✏️ Update LinkedIn Profile" if existing else "📝 LinkedIn Profile Information")
         
-        return self._render_manual_input()
+        manual_tab, export_tab = st.tabs(["📝 Manual Entry", "📦 LinkedIn Data Export"])
+        with manual_tab:
+            manual_profile = self._render_manual_input(existing)
+        with export_tab:
+            export_profile = self._render_export_upload(existing)
+        
+        return manual_profile or export_profile
+    
+    def _render_export_upload(self, existing: Optional[Dict] = None):
+        """Render LinkedIn data-export upload method"""
+        st.write("**Upload the ZIP archive from LinkedIn → Settings → Data privacy → Get a copy of your data:**")
+        
+        uploaded = st.file_uploader("LinkedIn data export (.zip)", type=["zip"])
+        if uploaded and st.button("📦 Import Profile", type="primary"):
+            try:
+                profile_data = parse_export(uploaded)
+            except LinkedInImportError as e:
+                st.error(f"❌ Could not import archive: {e}")
+                return None
+            
+            return self._store_profile(profile_data, f"linkedin_export_{uploaded.name}", is_update=bool(existing))
+        
+        return None
     
-    def _render_manual_input(self):
+    def _render_manual_input(self, existing: Optional[Dict] = None):
         """Render manual profile input method"""
-        st.write("**Enter your LinkedIn profile information:**")
+        st.write("**Edit your LinkedIn profile information:**" if existing else "**Enter your LinkedIn profile information:**")
+        
+        # Prefill values when editing
+        current = existing or {}
+        first_exp = (current.get("experience") or [{}])[0]
+        first_edu = (current.get("education") or [{}])[0]
+        location_value = current.get("location", "")
         
         with st.form("manual_profile_form"):
             col1, col2 = st.columns(2)
             
             with col1:
                 st.subheader("Basic Information")
-                full_name = st.text_input("Full Name *", placeholder="John Doe")
-                headline = st.text_input("Professional Headline *", placeholder="Senior Software Engineer at Microsoft")
-                location = st.text_input("Location", placeholder="Seattle, WA")
+                full_name = st.text_input("Full Name *", value=current.get("fullName", ""), placeholder="John Doe")
+                headline = st.text_input("Professional Headline *", value=current.get("headline", ""), placeholder="Senior Software Engineer at Microsoft")
+                location = st.text_input("Location", value="" if location_value == "Not specified" else location_value, placeholder="Seattle, WA")
             
             with col2:
                 st.subheader("Current Position")
-                current_title = st.text_input("Current Job Title", placeholder="Senior Software Engineer")
-                current_company = st.text_input("Current Company", placeholder="Microsoft")
-                current_duration = st.text_input("Duration", placeholder="Jan 2020 - Present")
+                current_title = st.text_input("Current Job Title", value=first_exp.get("title", ""), placeholder="Senior Software Engineer")
+                current_company = st.text_input("Current Company", value=first_exp.get("company", ""), placeholder="Microsoft")
+                current_duration = st.text_input("Duration", value=first_exp.get("duration", ""), placeholder="Jan 2020 - Present")
             
             # Education section moved to full width
             st.subheader("Education")
             col3, col4 = st.columns(2)
             with col3:
-                education_school = st.text_input("School/University", placeholder="University of Washington")
-                education_degree = st.text_input("Degree", placeholder="Bachelor of Science in Computer Science")
+                education_school = st.text_input("School/University", value=first_edu.get("school", ""), placeholder="University of Washington")
+                education_degree = st.text_input("Degree", value=first_edu.get("degree", ""), placeholder="Bachelor of Science in Computer Science")
             with col4:
-                education_year = st.text_input("Graduation Year", placeholder="2018")
+                education_year = st.text_input("Graduation Year", value=first_edu.get("year", ""), placeholder="2018")
             
             summary = st.text_area(
                 "Professional Summary/About",
+                value=current.get("summary", ""),
                 placeholder="Write a brief summary of your professional background, skills, and career goals...",
                 height=100
             )
             
             skills_input = st.text_area(
                 "Skills (comma-separated)",
+                value=", ".join(skill.get("name", "") for skill in current.get("skills", [])),
                 placeholder="Python, JavaScript, React, Node.js, AWS, Docker, Machine Learning",
                 help="Enter your skills separated by commas"
             )
@@ -76,18 +110,23 @@ class ChatInterface:
             st.subheader("Additional Work Experience (Optional)")
             additional_experience = st.text_area(
                 "Previous positions",
+                value="\n".join(self._experience_line(exp) for exp in current.get("experience", [])[1:]),
                 placeholder="• Software Developer at ABC Corp (2018-2020)\n• Intern at XYZ Inc (Summer 2017)",
                 height=80
             )
             
-            submit_manual = st.form_submit_button("📝 Create Profile", type="primary")
+            submit_manual = st.form_submit_button("💾 Save Changes" if existing else "📝 Create Profile", type="primary")
+            if existing and st.form_submit_button("Cancel"):
+                st.session_state.editing_profile = False
+                st.rerun()
             
             if submit_manual and full_name and headline:
                 return self._create_manual_profile(
                     full_name, headline, location,
                     current_title, current_company, current_duration,
                     education_school, education_degree, education_year,
-                    summary, skills_input, additional_experience
+                    summary, skills_input, additional_experience,
+                    existing
                 )
             elif submit_manual:
                 st.error("Please fill in at least Full Name and Professional Headline (marked with *)")
@@ -97,23 +136,37 @@ class ChatInterface:
     def _create_manual_profile(self, full_name, headline, location,
                               current_title, current_company, current_duration,
                               education_school, education_degree, education_year,
-                              summary, skills_input, additional_experience):
-        """Create profile data from manual input"""
+                              summary, skills_input, additional_experience,
+                              existing: Optional[Dict] = None):
+        """Create profile data from manual input.
+        
+        When editing, entries the form did not change are carried over from the
+        existing profile as-is, so their details survive and the saved diff only
+        shows what the user actually edited.
+        """
+        current = existing or {}
+        old_experience = current.get("experience") or []
+        old_education = current.get("education") or []
         
         # Process experience
         experience = []
         if current_title and current_company:
-            experience.append({
-                "title": current_title,
-                "company": current_company,
-                "duration": current_duration or "Present",
-                "description": f"Currently working as {current_title} at {current_company}"
-            })
+            first_exp = old_experience[0] if old_experience else {}
+            if (first_exp.get("title"), first_exp.get("company")) == (current_title, current_company):
+                experience.append({**first_exp, "duration": current_duration or "Present"})
+            else:
+                experience.append({
+                    "title": current_title,
+                    "company": current_company,
+                    "duration": current_duration or "Present",
+                    "description": f"Currently working as {current_title} at {current_company}"
+                })
         
         if additional_experience:
+            previous_entries = {self._experience_line(exp): exp for exp in old_experience[1:]}
             for exp_line in additional_experience.strip().split('\n'):
                 if exp_line.strip():
-                    experience.append({
+                    experience.append(previous_entries.get(exp_line.strip()) or {
                         "title": "Previous Role",
                         "company": "Previous Company",
                         "duration": "Previous",
@@ -122,19 +175,27 @@ class ChatInterface:
         
         education = []
         if education_school:
-            education.append({
-                "school": education_school,
-                "degree": education_degree or "Degree",
-                "year": education_year or "N/A",
-                "details": f"Studied at {education_school}"
-            })
+            first_edu = old_education[0] if old_education else {}
+            if first_edu.get("school") == education_school:
+                education.append({**first_edu, "degree": education_degree or "Degree", "year": education_year or "N/A"})
+            else:
+                education.append({
+                    "school": education_school,
+                    "degree": education_degree or "Degree",
+                    "year": education_year or "N/A",
+                    "details": f"Studied at {education_school}"
+                })
+            # The form edits one entry; keep any others (e.g. from an export)
+            education.extend(old_education[1:])
         
         skills = []
         if skills_input:
+            previous_skills = {skill.get("name", "").lower(): skill for skill in current.get("skills", [])}
             skill_list = [skill.strip() for skill in skills_input.split(',') if skill.strip()]
-            skills = [{"name": skill, "endorsements": 0} for skill in skill_list]
+            skills = [previous_skills.get(skill.lower()) or {"name": skill, "endorsements": 0} for skill in skill_list]
         
         profile_data = {
+            **current,
             "fullName": full_name,
             "headline": headline,
             "location": location or "Not specified",
@@ -142,22 +203,41 @@ class ChatInterface:
             "experience": experience,
             "education": education,
             "skills": skills,
-            "input_method": "manual"
+            "input_method": current.get("input_method", "manual")
         }
         
+        return self._store_profile(profile_data, f"manual_entry_{full_name.replace(' ', '_').lower()}",
+                                   is_update=bool(existing))
+    
+    def _experience_line(self, exp: Dict) -> str:
+        """One line of the "Previous positions" box for an experience entry"""
+        if exp.get("title") == "Previous Role":
+            return exp.get("description", "")
+        return f"{exp.get('title', '')} at {exp.get('company', '')} ({exp.get('duration', '')})"
+    
+    def _store_profile(self, profile_data: Dict, profile_url: str, is_update: bool = False):
+        """Save a new or edited profile to session state and database"""
         # Save to session state
         st.session_state.profile_data = profile_data
-        st.session_state.profile_url = f"manual_entry_{full_name.replace(' ', '_').lower()}"
+        st.session_state.profile_url = profile_url
+        st.session_state.editing_profile = False
         
         # IMMEDIATELY save to database for persistence
+        diff = None
         try:
-            self.db_manager.save_user_profile(
+            diff = self.db_manager.save_user_profile(
                 st.session_state.user_id,
                 profile_data,
                 st.session_state.get('career_goals', []),
                 st.session_state.get('user_preferences', {})
             )
-            st.success("✅ Profile created and saved successfully!")
+            if is_update:
+                st.success(f"✅ Profile updated: {describe_diff(diff)}")
+            else:
+                st.success("✅ Profile created and saved successfully!")
+
+            # Warm up the answer to the most likely first question
+            self.agent_service.start_profile_prefetch(st.session_state.user_id, profile_data)
         except Exception as e:
             st.warning(f"⚠️ Profile created but not saved to database: {e}")
             st.success("✅ Profile created successfully!")
@@ -165,7 +245,11 @@ class ChatInterface:
         self._display_profile_preview(profile_data)
         
         # Add initial context to chat
-        self._add_initial_chat_context(profile_data)
+        if is_update:
+            if diff and diff["changed_sections"]:
+                self._add_update_chat_context(diff)
+        else:
+            self._add_initial_chat_context(profile_data)
         
         return profile_data
     
@@ -202,6 +286,15 @@ class ChatInterface:
             "agent_display": "📊 Profile Optimizer"
         })
     
+    def _add_update_chat_context(self, diff: Dict):
+        """Note a profile edit in the chat history"""
+        st.session_state.chat_history.append({
+            "role": "assistant",
+            "content": f"I've noted your profile changes ({describe_diff(diff)}). Ask me to review them whenever you're ready.",
+            "agent": "profile_analyzer",
+            "agent_display": "📊 Profile Optimizer"
+        })
+    
     def render_chat_interface(self, user_id: str, profile_data: Dict, 
                             career_goals: List, user_preferences: Dict):
         """Render main chat interface"""
@@ -227,38 +320,81 @@ class ChatInterface:
                 if st.button("🔍 Show Full Profile Data"):
                     st.json(profile_data)
         
-        user_prompt = st.chat_input("Ask about your LinkedIn profile optimization...")
+        # One turn at a time: the next prompt depends on the pending answer
+        user_prompt = st.chat_input(
+            "Ask about your LinkedIn profile optimization...",
+            disabled=bool(st.session_state.get('pending_job'))
+        )
         
         if user_prompt:
-            self._process_chat_message(user_prompt, user_id, profile_data, career_goals, user_preferences)
+            self._submit_chat_message(user_prompt, user_id, profile_data, career_goals, user_preferences)
         
         # Display chat history
         self._display_chat_history()
+        
+        self._poll_pending_job()
     
-    def _process_chat_message(self, user_prompt: str, user_id: str, profile_data: Dict, 
-                            career_goals: List, user_preferences: Dict):
-        """Process user chat message"""
-        try:
-            # Add user message to chat history
-            st.session_state.chat_history.append({"role": "user", "content": user_prompt})
+    def _submit_chat_message(self, user_prompt: str, user_id: str, profile_data: Dict, 
+                             career_goals: List, user_preferences: Dict):
+        """Queue user chat message for the background job runner"""
+        session_id = st.session_state.get('session_id')
+        turn_index = sum(1 for m in st.session_state.chat_history if m['role'] == 'assistant')
+        turn_key = hashlib.sha256(
+            f"{user_id}|{session_id}|{turn_index}|{user_prompt.strip()}".encode("utf-8")
+        ).hexdigest()
+        
+        pending = st.session_state.get('pending_job')
+        if pending:
+            if pending['key'] != turn_key:
+                # Input is disabled while a job runs, so this only happens in a race
+                st.warning("⚠️ Please wait for the current answer before asking again.")
+            # Otherwise the same turn was submitted again while the first one is still running
+            return
+        
+        # Add user message to chat history
+        st.session_state.chat_history.append({"role": "user", "content": user_prompt})
+        
+        job_id = get_job_runner().submit(
+            turn_key,
+            self.agent_service.process_message,
+            user_prompt, list(st.session_state.chat_history),
+            user_id, profile_data, career_goals, user_preferences,
+            session_id=session_id
+        )
+        st.session_state.pending_job = {"id": job_id, "key": turn_key}
+    
+    def _poll_pending_job(self):
+        """Collect the result of the pending chat job, rerunning until it finishes"""
+        pending = st.session_state.get('pending_job')
+        if not pending:
+            return
+        
+        runner = get_job_runner()
+        with st.spinner("🤖 Processing your request..."):
+            job = runner.wait(pending['id'], Config.JOB_POLL_INTERVAL_SECONDS)
+        
+        if job is None:
+            st.session_state.pending_job = None
+            st.warning("⚠️ The previous request was lost; please ask again.")
+            return
+        
+        if not job.done:
+            st.rerun()
+        
+        st.session_state.pending_job = None
+        if job.status == "done":
+            assistant_message, agent_info = job.result
             
-            # Get agent response
-            with st.spinner("🤖 Processing your request..."):
-                assistant_message, agent_info = self.agent_service.process_message(
-                    user_prompt, st.session_state.chat_history, 
-                    user_id, profile_data, career_goals, user_preferences
-                )
-                
-                # Add assistant response to chat history
-                st.session_state.chat_history.append({
-                    "role": "assistant",
-                    "content": assistant_message,
-                    "agent": agent_info["id"],
-                    "agent_display": agent_info["display"]
-                })
-                
-        except Exception as e:
-            st.error(f"❌ Error: {e}")
+            # Add assistant response to chat history
+            st.session_state.chat_history.append({
+                "role": "assistant",
+                "content": assistant_message,
+                "agent": agent_info["id"],
+                "agent_display": agent_info["display"]
+            })
+            st.rerun()
+        else:
+            st.error(f"❌ Error: {job.error}")
     
     def _display_chat_history(self):
         """Display chat history with agent information"""
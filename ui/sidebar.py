@@ -6,8 +6,9 @@ from datetime import datetime
 class SidebarManager:
     """Manages sidebar UI components"""
     
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, agent_service=None):
         self.db_manager = db_manager
+        self.agent_service = agent_service
     
     def render_sidebar(self, user_id: str, career_goals: List, user_preferences: Dict, profile_data: Dict) -> tuple:
         """Render complete sidebar"""
@@ -47,6 +48,25 @@ class SidebarManager:
             
             chat_count = len(st.session_state.get('chat_history', []))
             st.write(f"**Current Chat Messages:** {chat_count}")
+
+            try:
+                tokens_used = self.db_manager.get_tokens_used_today(user_id)
+                if Config.DAILY_TOKEN_QUOTA:
+                    remaining = max(0, Config.DAILY_TOKEN_QUOTA - tokens_used)
+                    st.write(f"**Tokens Remaining Today:** {remaining:,} / {Config.DAILY_TOKEN_QUOTA:,}")
+                    st.progress(min(1.0, tokens_used / Config.DAILY_TOKEN_QUOTA))
+                else:
+                    st.write(f"**Tokens Used Today:** {tokens_used:,}")
+            except Exception:
+                st.write("**Tokens Remaining Today:** Error loading")
+
+            cache_stats = self.db_manager.cache_stats()
+            st.write(f"**Query Cache Hit Rate:** {cache_stats['hit_rate']:.0%} ({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']})")
+
+            model_metrics = self.agent_service.get_model_metrics() if self.agent_service else {}
+            for tier, stats in model_metrics.items():
+                tokens = stats['prompt_tokens'] + stats['completion_tokens']
+                st.write(f"**Model `{tier}`:** {stats['calls']} calls, {tokens:,} tokens, p50 {stats['p50_latency_ms']:.0f}ms / p95 {stats['p95_latency_ms']:.0f}ms")
             
             if st.button("💾 Manual Save"):
                 try:
@@ -1,5 +1,7 @@
 import streamlit as st
 from typing import Dict, List
+import hashlib
+import json
 import uuid
 
 def generate_user_id():
@@ -26,6 +28,8 @@ def init_session_state():
         "profile_data": None,
         "profile_url": "",
         "conversation_context": [],
+        "pending_job": None,  # Background chat job awaiting its result
+        "editing_profile": False,  # Profile form shown prefilled for editing
         "memory_loaded": False  # Flag to track if memory has been loaded
     }
     
@@ -96,4 +100,9 @@ def force_save_current_state(db_manager, user_id: str):
         return True
     except Exception as e:
         st.error(f"Failed to save state: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def profile_hash(profile_data: Dict) -> str:
+    """Stable content hash of a profile, used to key derived artifacts"""
+    canonical = json.dumps(profile_data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
\ No newline at end of file
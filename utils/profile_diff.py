@@ -0,0 +1,113 @@
+"""Field-level diffs between two versions of a profile.
+
+A profile is split into sections: headline, summary, experience, education,
+skills, and basics (every other top-level field). Scalar sections report
+old/new values. List sections match entries by identity, so an edited job
+description is one "changed" entry rather than a remove plus an add:
+experience by title and company, education by school and degree, skills by
+skill_id or name.
+"""
+from typing import Dict, List, Optional, Tuple
+
+PROFILE_SECTIONS = ("basics", "headline", "summary", "experience", "education", "skills")
+LIST_SECTIONS = ("experience", "education", "skills")
+# Entries named per list in describe_diff before summarizing the rest
+DESCRIBE_MAX_ENTRIES = 5
+
+def section_of(key: str) -> str:
+    """Section a top-level profile key belongs to"""
+    return key if key in PROFILE_SECTIONS else "basics"
+
+def _norm(value) -> str:
+    return " ".join(str(value or "").lower().split())
+
+def entry_label(section: str, entry) -> str:
+    """Human-readable identity of a list entry"""
+    if not isinstance(entry, dict):
+        return str(entry)
+    if section == "experience":
+        return " at ".join(part for part in (entry.get("title"), entry.get("company")) if part) or "Untitled role"
+    if section == "education":
+        return ", ".join(part for part in (entry.get("degree"), entry.get("school")) if part) or "Untitled entry"
+    return entry.get("name", "")
+
+def _entry_key(section: str, entry) -> Tuple:
+    if not isinstance(entry, dict):
+        return (_norm(entry),)
+    if section == "experience":
+        return (_norm(entry.get("title")), _norm(entry.get("company")))
+    if section == "education":
+        return (_norm(entry.get("school")), _norm(entry.get("degree")))
+    if entry.get("skill_id") is not None:
+        return (entry["skill_id"],)
+    return (_norm(entry.get("name")),)
+
+def _keyed(section: str, entries: List) -> Dict[Tuple, object]:
+    """Entries by identity; repeated identities are told apart by occurrence"""
+    keyed, seen = {}, {}
+    for entry in entries or []:
+        key = _entry_key(section, entry)
+        seen[key] = seen.get(key, 0) + 1
+        keyed[key + (seen[key],)] = entry
+    return keyed
+
+def _diff_list(section: str, old: List, new: List) -> Optional[Dict]:
+    old_keyed, new_keyed = _keyed(section, old), _keyed(section, new)
+    added = [entry_label(section, new_keyed[k]) for k in new_keyed if k not in old_keyed]
+    removed = [entry_label(section, old_keyed[k]) for k in old_keyed if k not in new_keyed]
+    changed = [entry_label(section, new_keyed[k]) for k in new_keyed
+               if k in old_keyed and old_keyed[k] != new_keyed[k]]
+    reordered = not (added or removed or changed) and list(old_keyed) != list(new_keyed)
+    if not (added or removed or changed or reordered):
+        return None
+    return {"added": added, "removed": removed, "changed": changed, "reordered": reordered}
+
+def diff_profiles(old: Optional[Dict], new: Optional[Dict]) -> Dict:
+    """Return {"changed_sections": [...], "fields": {section_or_key: change}}"""
+    old, new = old or {}, new or {}
+    fields = {}
+    for section in LIST_SECTIONS:
+        change = _diff_list(section, old.get(section), new.get(section))
+        if change:
+            fields[section] = change
+    for key in dict.fromkeys(list(old) + list(new)):
+        if key in LIST_SECTIONS or old.get(key) == new.get(key):
+            continue
+        fields[key] = {"old": old.get(key), "new": new.get(key)}
+
+    changed = {section_of(key) for key in fields}
+    return {
+        "changed_sections": [section for section in PROFILE_SECTIONS if section in changed],
+        "fields": fields
+    }
+
+def changed_values(old: Optional[Dict], new: Optional[Dict]) -> Dict:
+    """New values of the changed fields; list sections keep only added or edited entries"""
+    old, new = old or {}, new or {}
+    values = {}
+    for key, value in new.items():
+        if key in LIST_SECTIONS:
+            old_keyed = _keyed(key, old.get(key))
+            entries = [entry for entry_key, entry in _keyed(key, value).items()
+                       if old_keyed.get(entry_key) != entry]
+            if entries:
+                values[key] = entries
+        elif old.get(key) != value:
+            values[key] = value
+    return values
+
+def _names(labels: List[str]) -> str:
+    shown = ", ".join(labels[:DESCRIBE_MAX_ENTRIES])
+    extra = len(labels) - DESCRIBE_MAX_ENTRIES
+    return f"{shown} and {extra} more" if extra > 0 else shown
+
+def describe_diff(diff: Dict) -> str:
+    """One-line summary of a diff, e.g. for chat or agent context"""
+    parts = []
+    for key, change in diff["fields"].items():
+        if key in LIST_SECTIONS:
+            details = [f"{verb} {_names(change[verb])}" for verb in ("added", "removed", "changed") if change[verb]]
+            parts.append(f"{key} ({'; '.join(details) or 'reordered'})")
+        else:
+            parts.append(key)
+    return "; ".join(parts) if parts else "no changes"